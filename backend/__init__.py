@@ -8,7 +8,8 @@ from flask import Flask, render_template
 from .superadmin import ensure_super_admin
 from .extensions import db
 from .extensions import mail
-from .celery_app import make_celery
+from .utils.indexes import ensure_indexes
+from .commands import register_commands
 
 # Import blueprints
 from .routes.profile import profile_blueprint
@@ -19,9 +20,11 @@ from .routes.auth.auth import auth_blueprint
 jwt = JWTManager()
 
 
-def create_app(config_name="default"):
+def create_app(config_name="default", create_indexes=None):
     # Load environment variables
     load_dotenv()
+    if create_indexes is None:
+        create_indexes = os.getenv("ENSURE_INDEXES", "true").lower() == "true"
 
     app = Flask(
         __name__,
@@ -54,7 +57,14 @@ def create_app(config_name="default"):
 
 
     mail.init_app(app)
-    celery = make_celery(app)  # bind celery to app  # 👈 create a Mail instance (will be initialized later)
+
+    # Indexes (idempotent; set ENSURE_INDEXES=false to leave it to `flask indexes apply`).
+    # Celery workers never create them, see get_flask_app.
+    if create_indexes:
+        ensure_indexes(db)
+    register_commands(app)
+    # Celery is not built here: backend.celery_app.celery is shared, and
+    # worker processes build their own app (get_flask_app)
 
 
     # ✅ CORS setup (official way)
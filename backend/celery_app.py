@@ -1,7 +1,11 @@
 # celery_app.py
+import json
 import os
+import threading
 from celery import Celery
+from celery.signals import worker_process_init
 from dotenv import load_dotenv
+from flask import current_app, has_app_context
 
 load_dotenv()
 
@@ -9,9 +13,72 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
 
+# ----------------- Queues -----------------
+# Transactional alerts, digests and bulk/admin work each get a queue (and
+# their own workers, see `flask queues worker`) so a mail backlog in one
+# can't hold up the others. Anything not routed below lands on bulk.
+QUEUE_ALERTS = os.getenv("CELERY_QUEUE_ALERTS", "alerts")
+QUEUE_DIGESTS = os.getenv("CELERY_QUEUE_DIGESTS", "digests")
+QUEUE_BULK = os.getenv("CELERY_QUEUE_BULK", "bulk")
+
+
+def _queue_settings(name: str, concurrency: int, prefetch: int) -> dict:
+    key = name.upper()
+    return {
+        "concurrency": int(os.getenv(f"CELERY_{key}_CONCURRENCY", concurrency)),
+        # messages reserved per worker process; 1 = a slow task never sits on queued work
+        "prefetch": int(os.getenv(f"CELERY_{key}_PREFETCH", prefetch)),
+    }
+
+
+QUEUES = {
+    QUEUE_ALERTS: _queue_settings("alerts", concurrency=8, prefetch=1),
+    QUEUE_DIGESTS: _queue_settings("digests", concurrency=2, prefetch=4),
+    QUEUE_BULK: _queue_settings("bulk", concurrency=2, prefetch=1),
+}
+
+# Task name -> queue. CELERY_TASK_ROUTES (JSON, same shape) adds or overrides.
+TASK_ROUTES = {
+    "backend.tasks.email_tasks.send_transaction_email_task": QUEUE_ALERTS,
+    "backend.tasks.email_tasks.send_digest_email_task": QUEUE_DIGESTS,
+}
+TASK_ROUTES.update(json.loads(os.getenv("CELERY_TASK_ROUTES", "{}")))
+
+# Redis delivers 0 first; each step is its own list per queue ("alerts:3")
+PRIORITY_STEPS = list(range(10))
+PRIORITY_SEP = ":"
+PRIORITY_ALERTS = 0
+PRIORITY_DIGESTS = 5
+PRIORITY_DEFAULT = 5
+
+_flask_app = None
+_flask_app_pid = None
+_flask_app_lock = threading.Lock()
+
+
+def get_flask_app():
+    """
+    The Flask app tasks run in: built on first use, once per process.
+    Keyed on the pid, so a forked worker child builds its own instead of
+    using one (and the connections it opened) from the parent. Built
+    without index creation: every prefork child would otherwise send a
+    round of createIndex calls on start; that is the web app's (or
+    `flask indexes apply`'s) job.
+    """
+    global _flask_app, _flask_app_pid
+    if _flask_app is not None and _flask_app_pid == os.getpid():
+        return _flask_app
+    with _flask_app_lock:
+        if _flask_app is None or _flask_app_pid != os.getpid():
+            from backend import create_app  # imported late: backend imports this module
+            _flask_app, _flask_app_pid = create_app(create_indexes=False), os.getpid()
+    return _flask_app
+
+
 def make_celery(app=None):
     """
     Create and configure a Celery app tied to Flask app context.
+    Without `app`, tasks run in the process's get_flask_app().
     """
     celery = Celery(
         app.import_name if app else __name__,
@@ -24,20 +91,55 @@ def make_celery(app=None):
         result_serializer="json",
         timezone="UTC",
         enable_utc=True,
+        task_default_queue=QUEUE_BULK,
+        task_routes={name: {"queue": queue} for name, queue in TASK_ROUTES.items()},
+        task_default_priority=PRIORITY_DEFAULT,
+        broker_transport_options={
+            "priority_steps": PRIORITY_STEPS,
+            "sep": PRIORITY_SEP,
+            "queue_order_strategy": "priority",
+        },
+        worker_prefetch_multiplier=int(os.getenv("CELERY_PREFETCH_MULTIPLIER", 1)),
+        result_expires=int(os.getenv("CELERY_RESULT_EXPIRES", 3600)),
     )
 
     # Attach Flask app context to tasks
     class ContextTask(celery.Task):
         def __call__(self, *args, **kwargs):
-            if app:
-                with app.app_context():
-                    return self.run(*args, **kwargs)
-            else:
-                # lazily import and get app if not passed
-                from backend import create_app  # adjust package name
-                flask_app = create_app()
-                with flask_app.app_context():
-                    return self.run(*args, **kwargs)
+            flask_app = app or get_flask_app()
+            if has_app_context() and current_app._get_current_object() is flask_app:
+                return self.run(*args, **kwargs)  # called inline from code already in the app
+            with flask_app.app_context():
+                return self.run(*args, **kwargs)
 
     celery.Task = ContextTask
     return celery
+
+
+def queue_keys(queue: str) -> list:
+    """The Redis lists holding `queue`'s messages, most urgent first."""
+    return [queue if pri == 0 else f"{queue}{PRIORITY_SEP}{pri}" for pri in PRIORITY_STEPS]
+
+
+def worker_argv(queue: str, concurrency: int = None, prefetch: int = None) -> list:
+    """`celery worker` arguments for a worker that consumes only `queue`."""
+    settings = QUEUES.get(queue, {"concurrency": 2, "prefetch": 1})
+    return [
+        "celery", "-A", "backend.celery_worker", "worker",
+        "-Q", queue,
+        "-n", f"{queue}@%h",
+        "--concurrency", str(concurrency or settings["concurrency"]),
+        "--prefetch-multiplier", str(prefetch or settings["prefetch"]),
+        "--loglevel", "info",
+    ]
+
+
+# The one Celery instance: tasks register on it, the worker runs it
+# (celery -A backend.celery_worker worker) and the outbox relay sends with it.
+celery = make_celery()
+
+
+@worker_process_init.connect
+def warm_worker_process(**kwargs):
+    # prefork children build their app before taking work, not on their first task
+    get_flask_app()
@@ -1,8 +1,9 @@
-from backend import create_app
-from backend.celery_app import make_celery
-
-flask_app = create_app()
-celery = make_celery(flask_app)
+# Worker entry point: celery -A backend.celery_worker worker
+# One worker per queue, tuned from env: flask queues worker alerts|digests|bulk
+# The Flask app is not built here; each worker process builds its own on
+# start (see get_flask_app in celery_app.py).
+from backend.celery_app import celery
 
 # Import tasks so Celery knows them
 import backend.tasks.email_tasks
+import backend.tasks.password_tasks
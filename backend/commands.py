@@ -0,0 +1,214 @@
+# backend/commands.py
+import os
+import time
+import click
+from flask.cli import AppGroup
+
+from .extensions import db, redis_client
+from .celery_app import QUEUES, queue_keys, worker_argv
+from .utils.indexes import ensure_indexes, check_hot_queries
+from .utils.rollups import rebuild_spending_rollups, check_spending_rollups
+from .utils.outbox import run_relay, OUTBOX_BATCH_SIZE
+from .utils.search import backfill_search_keys
+from .utils.metrics import reconcile_metrics, METRICS_RECONCILE_INTERVAL
+from .utils.migrations import normalize_balances, normalize_amounts, wrap_weak_password_hashes
+from .utils.digests import migrate_legacy_keys
+
+# ----------------- flask indexes ... -----------------
+indexes_cli = AppGroup("indexes", help="Manage MongoDB indexes.")
+
+
+@indexes_cli.command("apply")
+def apply_indexes():
+    """Create every registered index (idempotent)."""
+    failures = ensure_indexes(db)
+    for collection, name, error in failures:
+        click.echo(f"❌ {collection}.{name}: {error}", err=True)
+    if failures:
+        raise SystemExit(1)
+    click.echo("✅ Indexes applied")
+
+
+@indexes_cli.command("check")
+def check_indexes():
+    """Fail if any registered hot query is planned as a COLLSCAN."""
+    failures = check_hot_queries(db)
+    for name, stages in failures:
+        click.echo(f"❌ COLLSCAN: {name} ({' -> '.join(stages)})", err=True)
+    if failures:
+        raise SystemExit(1)
+    click.echo("✅ No hot query falls back to a collection scan")
+
+
+# ----------------- flask rollups ... -----------------
+rollups_cli = AppGroup("rollups", help="Maintain the spending_rollups collection.")
+
+
+@rollups_cli.command("rebuild")
+@click.option("--user", "user_id", default=None, help="Only this user_id")
+@click.option("--month", default=None, help="Only this month (YYYY-MM)")
+def rebuild_rollups(user_id, month):
+    """Backfill / rebuild spending rollups from raw transactions."""
+    written = rebuild_spending_rollups(user_id, month)
+    click.echo(f"✅ Rebuilt {written} spending rollup(s)")
+
+
+@rollups_cli.command("check")
+@click.option("--user", "user_id", default=None, help="Only this user_id")
+@click.option("--month", default=None, help="Only this month (YYYY-MM)")
+def check_rollups(user_id, month):
+    """Compare spending rollups against raw transactions."""
+    mismatches = check_spending_rollups(user_id, month)
+    for m in mismatches[:50]:
+        click.echo(
+            f"❌ {m['user_id']} {m['month']} {m['narration']!r}: "
+            f"expected {m['expected']}, found {m['actual']}", err=True
+        )
+    if mismatches:
+        click.echo(f"{len(mismatches)} mismatch(es); run `flask rollups rebuild` to repair", err=True)
+        raise SystemExit(1)
+    click.echo("✅ Spending rollups are consistent")
+
+
+# ----------------- flask outbox ... -----------------
+outbox_cli = AppGroup("outbox", help="Transactional outbox for notifications.")
+
+
+@outbox_cli.command("relay")
+@click.option("--batch-size", default=OUTBOX_BATCH_SIZE, show_default=True)
+@click.option("--interval", default=1.0, show_default=True, help="Idle poll interval in seconds")
+@click.option("--once", is_flag=True, help="Drain what is due, then exit")
+def relay_outbox(batch_size, interval, once):
+    """Relay staged notifications from the outbox to Celery."""
+    sent = run_relay(batch_size=batch_size, interval=interval, once=once)
+    click.echo(f"✅ Relayed {sent} message(s)")
+
+
+# ----------------- flask search ... -----------------
+search_cli = AppGroup("search", help="Admin user search index.")
+
+
+@search_cli.command("backfill")
+def backfill_search():
+    """Populate users.search_keys for existing users."""
+    updated = backfill_search_keys()
+    click.echo(f"✅ Updated search keys for {updated} user(s)")
+
+
+# ----------------- flask metrics ... -----------------
+metrics_cli = AppGroup("metrics", help="Admin dashboard counters.")
+
+
+@metrics_cli.command("reconcile")
+@click.option("--check", is_flag=True, help="Only report drift, don't repair it")
+@click.option("--loop", is_flag=True, help="Keep running, reconciling every --interval seconds")
+@click.option("--interval", default=METRICS_RECONCILE_INTERVAL, show_default=True)
+def reconcile_metrics_command(check, loop, interval):
+    """Reconcile the metric counters against users and transactions."""
+    while True:
+        mismatches = reconcile_metrics(repair=not check)
+        for m in mismatches[:50]:
+            click.echo(f"❌ {m['kind']}:{m['key']} {m['field']}: expected {m['expected']}, found {m['actual']}",
+                       err=True)
+        if not mismatches:
+            click.echo("✅ Metrics are consistent")
+        elif not check:
+            click.echo(f"🔧 Repaired {len(mismatches)} drifted counter(s)")
+        if not loop:
+            break
+        time.sleep(interval)
+    if check and mismatches:
+        raise SystemExit(1)
+
+
+# ----------------- flask migrate ... -----------------
+migrate_cli = AppGroup("migrate", help="One-off data migrations.")
+
+
+def report_migration(converted, unconvertible, field, label, dry_run):
+    for doc in unconvertible:
+        click.echo(f"❌ {doc[label]}: {field} {doc[field]!r} is not a number", err=True)
+    click.echo(f"{'🔎 Would convert' if dry_run else '✅ Converted'} {converted} {field}(s)")
+    if unconvertible:
+        click.echo(f"{len(unconvertible)} {field}(s) need fixing by hand", err=True)
+        raise SystemExit(1)
+
+
+@migrate_cli.command("balances")
+@click.option("--dry-run", is_flag=True, help="Only report what would change")
+def migrate_balances(dry_run):
+    """Convert string users.balance values to numbers."""
+    converted, unconvertible = normalize_balances(dry_run=dry_run)
+    report_migration(converted, unconvertible, "balance", "accountNumber", dry_run)
+
+
+@migrate_cli.command("amounts")
+@click.option("--dry-run", is_flag=True, help="Only report what would change")
+def migrate_amounts(dry_run):
+    """Convert string transactions.amount values to numbers."""
+    converted, unconvertible = normalize_amounts(dry_run=dry_run)
+    report_migration(converted, unconvertible, "amount", "_id", dry_run)
+
+
+@migrate_cli.command("password-hashes")
+@click.option("--dry-run", is_flag=True, help="Only count the hashes that would be wrapped")
+def migrate_password_hashes(dry_run):
+    """Wrap password hashes below PASSWORD_HASH_ROUNDS (bulk-onboarded users) at full cost."""
+    wrapped = wrap_weak_password_hashes(dry_run=dry_run)
+    click.echo(f"{'🔎 Would wrap' if dry_run else '✅ Wrapped'} {wrapped} password hash(es)")
+
+
+@migrate_cli.command("digest-keys")
+def migrate_digest_keys():
+    """Move digests buffered under the pre-hash-tag Redis key names."""
+    moved = migrate_legacy_keys()
+    click.echo(f"✅ Moved {moved} buffered digest(s)")
+
+
+# ----------------- flask queues ... -----------------
+queues_cli = AppGroup("queues", help="Celery queues (alerts, digests, bulk).")
+
+
+@queues_cli.command("depth")
+@click.option("--watch", type=float, default=0, help="Repeat every N seconds")
+def queue_depth(watch):
+    """Messages waiting per queue, split by priority, plus unacked."""
+    while True:
+        pipe = redis_client.pipeline(transaction=False)
+        for queue in QUEUES:
+            for key in queue_keys(queue):
+                pipe.llen(key)
+        pipe.hlen("unacked")  # reserved by workers, not yet acknowledged
+        counts = pipe.execute()
+
+        for i, queue in enumerate(QUEUES):
+            per_priority = counts[i * len(queue_keys(queue)):(i + 1) * len(queue_keys(queue))]
+            by_priority = ", ".join(f"p{p}={n}" for p, n in enumerate(per_priority) if n)
+            click.echo(f"{queue:<10} {sum(per_priority):>8}" + (f"   ({by_priority})" if by_priority else ""))
+        click.echo(f"{'unacked':<10} {counts[-1]:>8}")
+        if not watch:
+            break
+        time.sleep(watch)
+        click.echo()
+
+
+@queues_cli.command("worker", context_settings={"ignore_unknown_options": True})
+@click.argument("queue", type=click.Choice(list(QUEUES)))
+@click.option("--concurrency", type=int, help="Override CELERY_<QUEUE>_CONCURRENCY")
+@click.option("--prefetch", type=int, help="Override CELERY_<QUEUE>_PREFETCH")
+@click.argument("celery_args", nargs=-1, type=click.UNPROCESSED)
+def queue_worker(queue, concurrency, prefetch, celery_args):
+    """Run a Celery worker for one queue with its tuned concurrency and prefetch."""
+    argv = worker_argv(queue, concurrency, prefetch) + list(celery_args)
+    click.echo(f"🚀 {' '.join(argv)}")
+    os.execvp(argv[0], argv)  # replaces this process; the worker builds its own app
+
+
+def register_commands(app):
+    app.cli.add_command(indexes_cli)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(outbox_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(metrics_cli)
+    app.cli.add_command(queues_cli)
+    app.cli.add_command(migrate_cli)
@@ -1,22 +1,46 @@
 from functools import wraps
-from flask import jsonify
-from backend.extensions import db
+from flask import jsonify, request
 from flask_jwt_extended import get_jwt_identity
-from bson import ObjectId
+from backend.utils.user_cache import is_blocked
+from backend.utils.rate_limit import take, client_ip
 
 def block_check_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         user_id = get_jwt_identity()
 
-        # Fetch the user from DB
-        user = db.users.find_one({'_id': ObjectId(user_id)})
-        if not user:
+        # Blocked flag comes from the short-TTL cache, or one read per request
+        blocked = is_blocked(user_id)
+        if blocked is None:
             return jsonify({"error": "User not found"}), 404
         
         # If blocked, stop here
-        if user.get('blocked', False):
+        if blocked:
             return jsonify({"error": "Account is blocked"}), 403
         
         return f(*args, **kwargs)
     return decorated_function
+
+
+def rate_limited(name, ip_limit=None, user_limit=None, user_key=get_jwt_identity):
+    """
+    Token-bucket limits per client IP and per user ("10/minute" specs),
+    checked together in one Redis round trip. Over the limit -> 429 with
+    Retry-After. `user_key` returns the identity to bucket by (the JWT
+    identity by default, so put this under @jwt_required()).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            user = user_key() if user_limit else None
+            allowed, retry_after = take([
+                (f"rl:{name}:ip:{client_ip(request)}", ip_limit),
+                (f"rl:{name}:user:{user}" if user else None, user_limit),
+            ])
+            if not allowed:
+                response = jsonify({"error": "Too many requests, please slow down"})
+                response.headers["Retry-After"] = str(max(1, retry_after))
+                return response, 429
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
@@ -4,6 +4,7 @@ from dotenv import load_dotenv
 # backend/extensions.py
 from flask_mail import Mail
 from celery import Celery
+from redis import Redis
 
 # Load environment variables from .env
 load_dotenv()
@@ -18,3 +19,6 @@ mongo_client = MongoClient(MONGO_URI)
 db = mongo_client.get_database("bnkin")  # replace "bnkin" with your db name if needed
 
 mail = Mail()
+
+# Same Redis as the Celery broker; connects lazily, one pool per process
+redis_client = Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
@@ -1,9 +1,28 @@
-import random
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from bson import ObjectId
+from bson.errors import InvalidId
 from datetime import datetime
 from backend.extensions import db  # assuming Mongo client is set up
+from backend.utils.rollups import spending_rollup_edit_ops
+from backend.utils.ledger import parse_money
+from backend.utils.user_cache import invalidate_user, invalidate_all_users, cache_stats
+from backend.utils.pagination import InvalidCursor, keyset_filter, keyset_page, parse_date_range
+from backend.utils.search import (
+    SEARCH_FIELDS, SEARCH_MIN_LENGTH, normalise, search_keys, search_query, refresh_search_keys
+)
+from backend.utils.passwords import PasswordPoolBusy, hash_password, hash_passwords, is_password_hash
+from backend.utils.account_numbers import next_account_number, allocate_account_numbers
+from backend.tasks.password_tasks import wrap_password_hashes_task
+from backend.utils.metrics import (
+    apply_deltas, merge_deltas, user_deltas, blocked_deltas, transaction_deltas, read_metrics
+)
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, BulkWriteError
 import traceback
+import json
+import io
+import csv
+import os
 
 admin_blueprint = Blueprint('admin', __name__)
 
@@ -41,40 +60,138 @@ def format_date(dt, fmt="%Y-%m-%d"):
         return dt.strftime(fmt)
     return dt  # leave as-is if already string or None
 
-def generate_unique_account_number():
-    prefix = "00103"
-    while True:
-        # 7 random digits → total length = 12
-        suffix = str(random.randint(10**6, 10**7 - 1))
-        account_number = prefix + suffix
-
-        # check uniqueness in DB
-        if not db.users.find_one({"accountNumber": account_number}):
-            return account_number
-
-@admin_blueprint.route('/users', methods=['POST'])
-def create_user():
-    data = request.get_json()
-    if not data:
-        return jsonify({"error": "Missing required data"}), 400
-
-    required_fields = [
-        'firstName', 'lastName', 'email', 'gender', 'dateOfBirth',
-        'accountType', 'address', 'postalCode', 'state', 'country',
-        'currency', 'password', 'pin'
-    ]
-    for field in required_fields:
-        if field not in data:
-            return jsonify({"error": f"Missing required field: {field}"}), 400
+INITIATOR_CHUNK_SIZE = 1000
+INITIATOR_FIELDS = {"firstName": 1, "middleName": 1, "lastName": 1, "accountNumber": 1}
+
+
+def iter_chunks(cursor, size):
+    """Yield lists of up to `size` documents from a cursor."""
+    chunk = []
+    for doc in cursor:
+        chunk.append(doc)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def initiator_lookup_keys(user_id):
+    """
+    transactions.user_id is usually the user's ObjectId as a string, but older
+    rows hold a raw ObjectId or a non-ObjectId string. Return the _id values
+    that may match it.
+    """
+    if isinstance(user_id, str):
+        return [ObjectId(user_id), user_id] if ObjectId.is_valid(user_id) else [user_id]
+    return [user_id]
+
+
+def resolve_initiators(transactions, known=None):
+    """
+    Map str(user_id) -> user for a chunk of transactions with a single $in
+    query. `known` (str(_id) -> user) is consulted first and updated with
+    whatever gets fetched, so repeated chunks don't re-query.
+    """
+    known = known if known is not None else {}
+    missing = []
+    for tx in transactions:
+        user_id = tx.get("user_id")
+        if user_id and safe_str(user_id) not in known:
+            missing.extend(initiator_lookup_keys(user_id))
+
+    if missing:
+        unique_keys = list({(type(k), safe_str(k)): k for k in missing}.values())
+        for user in db.users.find({"_id": {"$in": unique_keys}}, INITIATOR_FIELDS):
+            known[safe_str(user["_id"])] = user
+        # remember misses too (deleted users), so they aren't looked up again
+        for key in missing:
+            known.setdefault(safe_str(key), None)
+    return known
+
+
+def format_admin_user(user):
+    return {
+        "_id": safe_str(user.get("_id")),
+        "accountNumber": user.get("accountNumber"),
+        "name": user.get("name", ""),
+        "email": user.get("email", ""),
+        "phone": user.get("phone", "—"),
+        "balance": user.get("balance", 0),
+        "status": user.get("status", "Active"),
+        "accountType": user.get("accountType", "Standard"),
+        "password": user.get("password", ""),
+        "pin": user.get("pin", ""),
+        "joinDate": format_date(user.get("joinDate"), "%Y-%m-%d"),
+    }
 
-    existing_user = db.users.find_one({'email': data['email']})
-    if existing_user:
-        return jsonify({"error": "Email already taken"}), 400
 
-    if data['password'] != data.get('confirmPassword'):
-        return jsonify({"error": "Passwords do not match"}), 400
+def format_admin_transaction(tx, user):
+    return {
+        "_id": safe_str(tx.get("_id")),
+        "user_id": safe_str(tx.get("user_id")),
+        "initiator_name": build_full_name(user),
+        "initiator_account": user.get("accountNumber") if user else "Unknown",
+        "from_account": tx.get("from_account", ""),
+        "beneficiary_bank": tx.get("beneficiary_bank", ""),
+        "beneficiary_account": tx.get("beneficiary_account", ""),
+        "beneficiary_name": tx.get("beneficiary_name", ""),
+        "amount": tx.get("amount", 0),
+        "narration": tx.get("narration", ""),
+        "timestamp": format_timestamp(tx.get("timestamp")),  # ✅ formatted
+        "type": tx.get("type", ""),
+        "status": tx.get("status", "")
+    }
 
-    user_data = {
+def apply_transaction_edits(pairs):
+    """Move dashboard counters and spending rollups for (before, after) transaction pairs."""
+    pairs = list(pairs)
+    if not pairs:
+        return
+    apply_deltas(merge_deltas(*(
+        delta for before, after in pairs
+        for delta in (transaction_deltas(before, -1), transaction_deltas(after))
+    )))
+    rollup_ops = spending_rollup_edit_ops(pairs)
+    if rollup_ops:
+        db.spending_rollups.bulk_write(rollup_ops, ordered=False)
+
+# User fields the dashboard counters depend on
+METRIC_USER_FIELDS = ("blocked", "accountType", "balance")
+
+def is_duplicate_of(error: DuplicateKeyError, field: str) -> bool:
+    """True if a DuplicateKeyError came from the unique index on `field`."""
+    key_pattern = (error.details or {}).get("keyPattern") or {}
+    return field in key_pattern or field in str(error)
+
+def insert_with_account_number(user_data, attempts: int = 5):
+    """
+    Insert a new user with a sequence-allocated account number. Numbers from
+    the counter never collide with each other or with the old random ones;
+    the retry only covers numbers entered by hand inside the sequence range.
+    """
+    for _ in range(attempts):
+        user_data["accountNumber"] = next_account_number()
+        user_data["search_keys"] = search_keys(user_data)
+        try:
+            db.users.insert_one(user_data)
+            apply_deltas(user_deltas(None, user_data))
+            return user_data["accountNumber"]
+        except DuplicateKeyError as e:
+            if not is_duplicate_of(e, "accountNumber"):
+                raise
+    raise RuntimeError("Could not allocate a free account number")
+
+REQUIRED_USER_FIELDS = [
+    'firstName', 'lastName', 'email', 'gender', 'dateOfBirth',
+    'accountType', 'address', 'postalCode', 'state', 'country',
+    'currency', 'password', 'pin'
+]
+
+def new_user_document(data, password_hash):
+    """Build a user document from validated input. accountNumber is allocated on insert."""
+    now = datetime.utcnow()
+    return {
         "_id": ObjectId(),
         "firstName": data['firstName'],
         "middleName": data.get('middleName', ''),
@@ -88,25 +205,256 @@ def create_user():
         "state": data['state'],
         "country": data['country'],
         "currency": data['currency'],
-        "password": data['password'],  # ⚠️ should hash in production
+        "password": password_hash,
         "pin": data['pin'],
         "agreeToTerms": data.get('agreeToTerms', True),
         "blocked": False,
-        "accountNumber": generate_unique_account_number(),
+        "accountNumber": None,  # allocated on insert
         "balance": 0.0,
-        "createdAt": datetime.utcnow(),
-        "updatedAt": datetime.utcnow(),
+        "createdAt": now,
+        "updatedAt": now,
         "role": "user"  # default role
     }
 
-    db.users.insert_one(user_data)
+@admin_blueprint.route('/users', methods=['POST'])
+def create_user():
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "Missing required data"}), 400
+
+    for field in REQUIRED_USER_FIELDS:
+        if field not in data:
+            return jsonify({"error": f"Missing required field: {field}"}), 400
+
+    existing_user = db.users.find_one({'email': data['email']})
+    if existing_user:
+        return jsonify({"error": "Email already taken"}), 400
+
+    if data['password'] != data.get('confirmPassword'):
+        return jsonify({"error": "Passwords do not match"}), 400
+
+    try:
+        user_data = new_user_document(data, hash_password(data['password']))
+    except PasswordPoolBusy:
+        return jsonify({"error": "Server busy, please retry"}), 503
+    try:
+        insert_with_account_number(user_data)
+    except DuplicateKeyError:
+        return jsonify({"error": "Email already taken"}), 400
 
     return jsonify({
         "message": "User account created successfully",
         "userId": str(user_data["_id"]),
-        "accountNumber": user_data["accountNumber"]                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                             
+        "accountNumber": user_data["accountNumber"]
     }), 201
 
+# ----------------- Bulk onboarding -----------------
+BULK_USER_CHUNK_SIZE = int(os.getenv("BULK_USER_CHUNK_SIZE", 1000))
+BULK_USER_MAX_ROWS = int(os.getenv("BULK_USER_MAX_ROWS", 250_000))
+
+
+def decode_lines(stream, unreadable):
+    """
+    Yield the body's lines as text, decoding each line on its own, so one
+    bad byte sequence only spoils its line. An undecodable line is yielded
+    with replacement characters and its error appended to `unreadable`.
+    """
+    if isinstance(stream, io.RawIOBase):
+        stream = io.BufferedReader(stream)  # line iteration over a raw stream reads byte by byte
+    for line_number, raw in enumerate(stream):
+        try:
+            line = raw.decode("utf-8")
+        except UnicodeDecodeError as e:
+            unreadable.append(f"Unreadable row: {e}")
+            line = raw.decode("utf-8", errors="replace")
+        yield line.lstrip("\ufeff") if line_number == 0 else line
+
+
+def iter_bulk_rows(stream, file_format):
+    """
+    Yield (row_number, data, error) for each row of an uploaded CSV or NDJSON
+    body, reading the request stream incrementally. Row numbers are 1-based
+    data rows (the CSV header is not counted). A row that isn't valid UTF-8
+    or CSV is reported as that row's error and the rest are still read.
+    """
+    unreadable = []
+    lines = decode_lines(stream, unreadable)
+    if file_format == "csv":
+        reader = csv.DictReader(lines)
+        row_number = 0
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                row = None
+                unreadable.append(f"Unreadable row: {e}")
+            row_number += 1
+            if unreadable:
+                yield row_number, None, unreadable[-1]
+                unreadable.clear()
+                continue
+            data = {k.strip(): (v or "").strip() for k, v in row.items() if k}
+            yield row_number, data, None
+
+    row_number = 0
+    for line in lines:
+        if not line.strip():
+            unreadable.clear()  # a blank line isn't a row, even if it didn't decode
+            continue
+        row_number += 1
+        if unreadable:
+            yield row_number, None, unreadable.pop()
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield row_number, None, "Row must be a JSON object"
+            continue
+        yield row_number, data, None
+
+
+def validate_bulk_row(data):
+    """Same rules as create_user; returns an error message or None."""
+    for field in REQUIRED_USER_FIELDS:
+        if data.get(field) in (None, ""):
+            return f"Missing required field: {field}"
+    if data.get('confirmPassword') not in (None, "") and data['password'] != data['confirmPassword']:
+        return "Passwords do not match"
+    return None
+
+
+def enqueue_hash_wrapping(user_ids):
+    """
+    Queue the full-cost wrap of a chunk's migration-cost hashes. If the broker
+    is down the hashes stay weak until `flask migrate password-hashes` runs.
+    """
+    if not user_ids:
+        return
+    try:
+        wrap_password_hashes_task.apply_async(args=[user_ids], retry=False)
+    except Exception as e:
+        print(f"❌ Could not queue password hash wrapping for {len(user_ids)} user(s): {e}")
+
+
+def insert_user_chunk(rows, report):
+    """
+    Insert a chunk of validated (row_number, data) pairs: one $in query for
+    taken emails, one counter round trip for account numbers, one unordered
+    insert_many. Results are appended to report["created"] / report["errors"].
+    """
+    emails = [data["email"] for _, data in rows]
+    taken = {u["email"] for u in db.users.find({"email": {"$in": emails}}, {"email": 1})}
+
+    pending = []
+    for row_number, data in rows:
+        if data["email"] in taken:
+            report["errors"].append({"row": row_number, "email": data["email"], "error": "Email already taken"})
+        else:
+            pending.append((row_number, data))
+    if not pending:
+        return
+
+    # Cheap migration-cost hashes, wrapped at full cost by the bulk queue
+    # below. Partners migrating customers may send bcrypt hashes; those are
+    # kept as-is (and wrapped too if below full cost).
+    password_hashes = hash_passwords([str(data["password"]) for _, data in pending])
+    docs = []
+    for (_, data), password_hash, account_number in zip(
+        pending, password_hashes, allocate_account_numbers(len(pending))
+    ):
+        user_data = new_user_document(data, password_hash)
+        user_data["accountNumber"] = account_number
+        user_data["search_keys"] = search_keys(user_data)
+        docs.append(user_data)
+
+    failed = {}
+    try:
+        db.users.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        failed = {err["index"]: err for err in e.details.get("writeErrors", [])}
+
+    apply_deltas(merge_deltas(*(user_deltas(None, d) for i, d in enumerate(docs) if i not in failed)))
+    enqueue_hash_wrapping([str(d["_id"]) for i, d in enumerate(docs) if i not in failed])
+
+    for index, ((row_number, data), user_data) in enumerate(zip(pending, docs)):
+        err = failed.get(index)
+        if err is not None:
+            key_pattern = err.get("keyPattern") or {}
+            if err.get("code") == 11000 and "accountNumber" in key_pattern:
+                # Collided with a legacy random number; take a fresh one.
+                try:
+                    insert_with_account_number(user_data)
+                    err = None
+                except DuplicateKeyError:
+                    err = {"code": 11000, "keyPattern": {"email": 1}}
+                except RuntimeError as retry_error:
+                    err = {"errmsg": str(retry_error)}
+        if err is None:
+            report["created"].append({
+                "row": row_number,
+                "email": user_data["email"],
+                "userId": str(user_data["_id"]),
+                "accountNumber": user_data["accountNumber"],
+            })
+        elif err.get("code") == 11000 and "email" in (err.get("keyPattern") or {}):
+            report["errors"].append({"row": row_number, "email": data["email"], "error": "Email already taken"})
+        else:
+            report["errors"].append({"row": row_number, "email": data["email"], "error": err.get("errmsg", "Insert failed")})
+
+
+@admin_blueprint.route('/users/bulk', methods=['POST'])
+def bulk_create_users():
+    """
+    Onboard many users from a CSV (text/csv) or NDJSON (application/x-ndjson)
+    body, or ?format=csv|ndjson. Rows are validated and inserted in chunks;
+    the response lists the created accounts and a per-row error report.
+    """
+    file_format = request.args.get("format")
+    if not file_format:
+        file_format = "csv" if request.mimetype in ("text/csv", "application/csv") else "ndjson"
+    file_format = file_format.lower()
+    if file_format not in ("csv", "ndjson"):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    report = {"created": [], "errors": []}
+    seen_emails = set()
+    chunk = []
+    processed = 0
+    for row_number, data, error in iter_bulk_rows(request.stream, file_format):
+        if row_number > BULK_USER_MAX_ROWS:
+            report["errors"].append({"row": row_number, "email": None,
+                                     "error": f"Upload exceeds {BULK_USER_MAX_ROWS} rows; remaining rows skipped"})
+            break
+        processed += 1
+        email = data.get("email") if data else None
+        error = error or validate_bulk_row(data)
+        if not error and email in seen_emails:
+            error = "Duplicate email in upload"
+        if error:
+            report["errors"].append({"row": row_number, "email": email, "error": error})
+            continue
+        seen_emails.add(email)
+        chunk.append((row_number, data))
+        if len(chunk) >= BULK_USER_CHUNK_SIZE:
+            insert_user_chunk(chunk, report)
+            chunk = []
+    if chunk:
+        insert_user_chunk(chunk, report)
+
+    report["errors"].sort(key=lambda e: e["row"])
+    return jsonify({
+        "processed": processed,
+        "createdCount": len(report["created"]),
+        "errorCount": len(report["errors"]),
+        "created": report["created"],
+        "errors": report["errors"],
+    }), 200
+
 
 # Edit a user's account
 @admin_blueprint.route('/users/<email>', methods=['PATCH'])
@@ -114,8 +462,27 @@ def edit_user(email):
     data = request.get_json()
     if not data:
         return jsonify({"error": "Missing required data"}), 400
-
-    db.users.update_one({'email': email}, {'$set': data})
+    if "balance" in data:
+        try:
+            data["balance"] = parse_money(data["balance"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    if "password" in data and not is_password_hash(data["password"]):
+        try:
+            data["password"] = hash_password(str(data["password"]))
+        except PasswordPoolBusy:
+            return jsonify({"error": "Server busy, please retry"}), 503
+
+    before = db.users.find_one_and_update(
+        {'email': email}, {'$set': data},
+        projection={field: 1 for field in SEARCH_FIELDS + ("name", "search_keys") + METRIC_USER_FIELDS},
+        return_document=ReturnDocument.BEFORE
+    )
+    if before:
+        user = {**before, **data}
+        invalidate_user(user["_id"])
+        refresh_search_keys(user)
+        apply_deltas(user_deltas(before, user))
     return jsonify({"message": "User account updated successfully"}), 200
 
 
@@ -128,61 +495,26 @@ def get_all_data():
         formatted_users = []
         for user in users:
             try:
-                formatted_users.append({
-                    "_id": safe_str(user.get("_id")),
-                    "accountNumber": user.get("accountNumber"),
-                    "name": user.get("name", ""),
-                    "email": user.get("email", ""),
-                    "phone": user.get("phone", "—"),
-                    "balance": user.get("balance", 0),
-                    "status": user.get("status", "Active"),
-                    "accountType": user.get("accountType", "Standard"),
-                    "password": user.get("password", ""),
-                    "pin": user.get("pin", ""),
-                    "joinDate": format_date(user.get("joinDate"), "%Y-%m-%d"),
-                })
+                formatted_users.append(format_admin_user(user))
             except Exception as e:
                 print(f"Error formatting user {user.get('_id')}: {e}")
                 continue  # skip problematic user
 
-        # Fetch transactions
-        transactions = list(db.transactions.find({}))
+        # Fetch transactions; initiators are resolved from the users we
+        # already loaded, with one $in query per chunk for anything missing
+        users_by_id = {str(u["_id"]): u for u in users}
         formatted_transactions = []
 
-        for tx in transactions:
-            try:
-                # get sender (initiator) info
-                user_id = tx.get("user_id")
-                user = None
-
-                if user_id:
-                    if isinstance(user_id, str):
-                        if ObjectId.is_valid(user_id):
-                            user = db.users.find_one({"_id": ObjectId(user_id)})
-                        else:
-                            user = db.users.find_one({"_id": user_id})
-                    else:
-                        user = db.users.find_one({"_id": user_id})
-
-                formatted_transactions.append({
-                    "_id": safe_str(tx.get("_id")),
-                    "user_id": safe_str(user_id),
-                    "initiator_name": build_full_name(user),
-                    "initiator_account": user.get("accountNumber") if user else "Unknown",
-                    "from_account": tx.get("from_account", ""),
-                    "beneficiary_bank": tx.get("beneficiary_bank", ""),
-                    "beneficiary_account": tx.get("beneficiary_account", ""),
-                    "beneficiary_name": tx.get("beneficiary_name", ""),
-                    "amount": tx.get("amount", 0),
-                    "narration": tx.get("narration", ""),
-                    "timestamp": format_timestamp(tx.get("timestamp")),  # ✅ formatted
-                    "type": tx.get("type", ""),
-                    "status": tx.get("status", "")
-                })
-
-            except Exception as e:
-                print(f"Error formatting transaction {tx.get('_id')}: {e}")
-                continue
+        for chunk in iter_chunks(db.transactions.find({}), INITIATOR_CHUNK_SIZE):
+            initiators = resolve_initiators(chunk, users_by_id)
+            for tx in chunk:
+                try:
+                    user_id = tx.get("user_id")
+                    user = initiators.get(safe_str(user_id)) if user_id else None
+                    formatted_transactions.append(format_admin_transaction(tx, user))
+                except Exception as e:
+                    print(f"Error formatting transaction {tx.get('_id')}: {e}")
+                    continue
 
         return jsonify({
             "users": formatted_users,
@@ -194,6 +526,196 @@ def get_all_data():
         return jsonify({"error": "Internal server error"}), 500
     
 
+# ---------------- Paginated / Streaming Admin Data ----------------
+ADMIN_PAGE_DEFAULT_LIMIT = 50
+ADMIN_PAGE_MAX_LIMIT = 500
+# Cursor sorts compare with $gt/$lt, which never cross BSON types: every field
+# here must hold one type (money is coerced on write, see `flask migrate`)
+USER_SORT_FIELDS = {"_id", "balance", "createdAt"}
+TRANSACTION_SORT_FIELDS = {"timestamp", "amount"}
+
+
+def page_params(allowed_sorts, default_sort):
+    """Read sort/order/limit/cursor/stream query params shared by the admin list endpoints."""
+    sort = request.args.get("sort", default_sort)
+    if sort not in allowed_sorts:
+        raise ValueError(f"sort must be one of: {', '.join(sorted(allowed_sorts))}")
+    direction = 1 if request.args.get("order", "desc").lower() == "asc" else -1
+    try:
+        limit = int(request.args.get("limit", ADMIN_PAGE_DEFAULT_LIMIT))
+    except ValueError:
+        limit = ADMIN_PAGE_DEFAULT_LIMIT
+    limit = min(max(limit, 1), ADMIN_PAGE_MAX_LIMIT)
+    stream = request.args.get("stream", "").lower() in ("1", "true", "yes")
+    return sort, direction, limit, request.args.get("cursor"), stream
+
+
+def sort_spec(sort, direction):
+    return [("_id", direction)] if sort == "_id" else [(sort, direction), ("_id", direction)]
+
+
+def stream_json_array(cursor, format_chunk, chunk_size=INITIATOR_CHUNK_SIZE):
+    """
+    Stream a cursor as one JSON array, a chunk at a time, so neither side ever
+    holds the full result set. `format_chunk` turns a list of docs into dicts.
+    """
+    def generate():
+        yield "["
+        first = True
+        for chunk in iter_chunks(cursor, chunk_size):
+            body = ",".join(json.dumps(item, default=str) for item in format_chunk(chunk))
+            if not body:
+                continue
+            yield body if first else "," + body
+            first = False
+        yield "]"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
+def paginated_find(collection, query, sort, direction, limit, cursor_token):
+    """One keyset page: (docs, next_cursor)."""
+    if cursor_token:
+        query = {"$and": [query, keyset_filter(cursor_token, sort, direction)]}
+    cursor = collection.find(query).sort(sort_spec(sort, direction)).limit(limit + 1)
+    return keyset_page(cursor, limit, sort)
+
+
+def user_filter(params):
+    """?status=blocked|active&accountType= as a users query (also used by bulk status)."""
+    query = {}
+    status = params.get("status")
+    if status == "blocked":
+        query["blocked"] = True
+    elif status == "active":
+        query["blocked"] = {"$ne": True}
+    if params.get("accountType"):
+        query["accountType"] = params["accountType"]
+    return query
+
+
+@admin_blueprint.route("/users", methods=["GET"])
+def list_users():
+    """
+    Users, filtered and paginated server-side.
+    ?status=blocked|active&accountType=&sort=_id|balance|createdAt&order=asc|desc
+    &limit=&cursor=   (or &stream=true for the whole filtered set as a streamed JSON array)
+    """
+    try:
+        sort, direction, limit, cursor_token, stream = page_params(USER_SORT_FIELDS, "_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = user_filter(request.args)
+
+    if stream:
+        cursor = db.users.find(query).sort(sort_spec(sort, direction))
+        return stream_json_array(cursor, lambda chunk: [format_admin_user(u) for u in chunk])
+
+    try:
+        users, next_cursor = paginated_find(db.users, query, sort, direction, limit, cursor_token)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    return jsonify({
+        "users": [format_admin_user(u) for u in users],
+        "limit": limit,
+        "next_cursor": next_cursor
+    }), 200
+
+
+def transaction_filter(params):
+    """
+    ?type=debit|credit&status=&user_id=&start=YYYY-MM-DD&end=YYYY-MM-DD as a
+    transactions query (also used by bulk edits). Raises ValueError on a bad date.
+    """
+    window = parse_date_range(params.get("start"), params.get("end"))
+    query = {}
+    if params.get("type") in ("debit", "credit"):
+        query["type"] = params["type"]
+    if params.get("status"):
+        query["status"] = params["status"]
+    if params.get("user_id"):
+        query["user_id"] = params["user_id"]
+    if window:
+        query["timestamp"] = window
+    return query
+
+
+@admin_blueprint.route("/transactions", methods=["GET"])
+def list_transactions():
+    """
+    Transactions, filtered and paginated server-side.
+    ?type=debit|credit&status=&user_id=&start=YYYY-MM-DD&end=YYYY-MM-DD
+    &sort=timestamp|amount&order=asc|desc&limit=&cursor=   (or &stream=true)
+    """
+    try:
+        sort, direction, limit, cursor_token, stream = page_params(TRANSACTION_SORT_FIELDS, "timestamp")
+        query = transaction_filter(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def format_chunk(chunk):
+        initiators = resolve_initiators(chunk)
+        return [
+            format_admin_transaction(tx, initiators.get(safe_str(tx.get("user_id"))))
+            for tx in chunk
+        ]
+
+    if stream:
+        cursor = db.transactions.find(query).sort(sort_spec(sort, direction))
+        return stream_json_array(cursor, format_chunk)
+
+    try:
+        transactions, next_cursor = paginated_find(db.transactions, query, sort, direction, limit, cursor_token)
+    except InvalidCursor:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    return jsonify({
+        "transactions": format_chunk(transactions),
+        "limit": limit,
+        "next_cursor": next_cursor
+    }), 200
+
+
+# ---------------- Admin User Search ----------------
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+
+
+@admin_blueprint.route("/users/search", methods=["GET"])
+def search_users():
+    """
+    Typeahead prefix search over name, email and account number.
+    ?q=<prefix>&limit=  — served from the multikey index on users.search_keys.
+    """
+    q = request.args.get("q", "")
+    if len(normalise(q)) < SEARCH_MIN_LENGTH:
+        return jsonify({"error": f"q must be at least {SEARCH_MIN_LENGTH} characters"}), 400
+    try:
+        limit = int(request.args.get("limit", SEARCH_DEFAULT_LIMIT))
+    except ValueError:
+        limit = SEARCH_DEFAULT_LIMIT
+    limit = min(max(limit, 1), SEARCH_MAX_LIMIT)
+
+    users = db.users.find(
+        search_query(q),
+        {"accountNumber": 1, "firstName": 1, "middleName": 1, "lastName": 1,
+         "email": 1, "blocked": 1, "accountType": 1}
+    ).limit(limit)
+
+    return jsonify({
+        "results": [{
+            "_id": safe_str(u["_id"]),
+            "accountNumber": u.get("accountNumber"),
+            "name": build_full_name(u),
+            "email": u.get("email", ""),
+            "accountType": u.get("accountType", "Standard"),
+            "blocked": u.get("blocked", False),
+        } for u in users]
+    }), 200
+
+
 # Get user by account number
 # backend/routes/admin/admin.py (continued)
 
@@ -243,19 +765,37 @@ def update_user(accountNumber):
             if value is not None:  # ignore null values
                 update_fields[key] = value
 
+        if "balance" in update_fields:
+            try:
+                update_fields["balance"] = parse_money(update_fields["balance"])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+        # The admin UI sends the stored hash back unchanged; only hash new passwords
+        if "password" in update_fields and not is_password_hash(update_fields["password"]):
+            update_fields["password"] = hash_password(str(update_fields["password"]))
+
         if update_fields:
-            db.users.update_one(
+            if any(field in update_fields for field in SEARCH_FIELDS + ("name",)):
+                update_fields["search_keys"] = search_keys({**user, **update_fields})
+            before = db.users.find_one_and_update(
                 {"accountNumber": accountNumber},
-                {"$set": update_fields}
+                {"$set": update_fields},
+                return_document=ReturnDocument.BEFORE
             )
+            invalidate_user(user["_id"])
+            if before:
+                apply_deltas(user_deltas(before, {**before, **update_fields}))
 
         # 🔧 Return the updated user (exclude _id so frontend doesn’t send it back again)
         updated_user = db.users.find_one(
             {"accountNumber": accountNumber},
-            {"_id": 0}  # exclude _id from response
+            {"_id": 0, "search_keys": 0}  # exclude _id from response
         )
         return jsonify(updated_user), 200
 
+    except PasswordPoolBusy:
+        return jsonify({"error": "Server busy, please retry"}), 503
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -268,7 +808,10 @@ def delete_user(accountNumber):
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        db.users.delete_one({"accountNumber": accountNumber})
+        result = db.users.delete_one({"accountNumber": accountNumber})
+        invalidate_user(user["_id"])
+        if result.deleted_count:
+            apply_deltas(user_deltas(user, None))
 
         return jsonify({"message": "User deleted successfully"}), 200
     except Exception as e:
@@ -295,13 +838,17 @@ def update_user_status(user_id):
     except Exception:
         return jsonify({"error": "Invalid user ID"}), 400
 
-    result = db.users.update_one(
+    before = db.users.find_one_and_update(
         {"_id": object_id},
-        {"$set": {"blocked": blocked_status}}
+        {"$set": {"blocked": blocked_status}},
+        projection={field: 1 for field in METRIC_USER_FIELDS},
+        return_document=ReturnDocument.BEFORE
     )
 
-    if result.matched_count == 0:
+    if before is None:
         return jsonify({"error": "User not found"}), 404
+    invalidate_user(object_id)
+    apply_deltas(user_deltas(before, {**before, "blocked": blocked_status}))
 
     message = (
         "User account blocked successfully"
@@ -312,6 +859,238 @@ def update_user_status(user_id):
     return jsonify({"message": message}), 200
 
 
+# ----------------- Bulk admin operations -----------------
+BULK_ADMIN_MAX_IDS = int(os.getenv("BULK_ADMIN_MAX_IDS", 10_000))
+
+
+def to_object_id(value):
+    """ObjectId(value), except that None is rejected rather than minting a new id."""
+    if value is None:
+        raise InvalidId("id is required")
+    return ObjectId(value)
+
+
+def parse_object_ids(values):
+    """Split raw ids into (ObjectIds, invalid ids)."""
+    ids, invalid = [], []
+    for value in values:
+        try:
+            ids.append(to_object_id(value))
+        except (InvalidId, TypeError):
+            invalid.append(value)
+    return ids, invalid
+
+
+def bulk_target(data, build_filter):
+    """
+    Resolve a bulk request body's {"ids": [...]} or {"filter": {...}} into
+    (query, invalid_ids). Raises ValueError if neither or both are given, or
+    the filter wouldn't narrow anything down.
+    """
+    ids, filters = data.get("ids"), data.get("filter")
+    if (ids is None) == (filters is None):
+        raise ValueError("Provide either 'ids' or 'filter'")
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            raise ValueError("'ids' must be a non-empty list")
+        if len(ids) > BULK_ADMIN_MAX_IDS:
+            raise ValueError(f"At most {BULK_ADMIN_MAX_IDS} ids per request")
+        object_ids, invalid = parse_object_ids(ids)
+        return {"_id": {"$in": object_ids}}, invalid
+    if not isinstance(filters, dict):
+        raise ValueError("'filter' must be an object")
+    query = build_filter(filters)
+    if not query:
+        raise ValueError("'filter' must narrow the selection")
+    return query, []
+
+
+@admin_blueprint.route('/users/status', methods=['PATCH'])
+def bulk_update_user_status():
+    """
+    Block or unblock many users in one update_many.
+    Body: {"blocked": true, "ids": [...]} or {"blocked": true, "filter": {"status": .., "accountType": ..}}
+    """
+    data = request.get_json(silent=True) or {}
+    if "blocked" not in data:
+        return jsonify({"error": "Missing 'blocked' field"}), 400
+    blocked_status = bool(data["blocked"])
+
+    try:
+        query, invalid = bulk_target(data, user_filter)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Only touch users whose status actually flips, so modified_count is
+    # exactly the change in the blocked counter.
+    flips = {"blocked": {"$ne": True}} if blocked_status else {"blocked": True}
+    result = db.users.update_many({"$and": [query, flips]}, {"$set": {"blocked": blocked_status}})
+    if result.modified_count:
+        apply_deltas(blocked_deltas(result.modified_count if blocked_status else -result.modified_count))
+
+    if "ids" in data:
+        for object_id in query["_id"]["$in"]:
+            invalidate_user(object_id)
+    else:
+        invalidate_all_users()
+
+    return jsonify({
+        "message": f"{result.modified_count} user account(s) {'blocked' if blocked_status else 'unblocked'}",
+        "blocked": blocked_status,
+        "modified": result.modified_count,
+        "invalidIds": invalid,
+    }), 200
+
+
+@admin_blueprint.route("/transactions/bulk", methods=["PATCH"])
+def bulk_update_transactions():
+    """
+    Edit many transactions in one write.
+      {"ids": [...], "set": {...}}       same fields for every listed transaction (update_many)
+      {"filter": {...}, "set": {...}}    status/beneficiary fields for every match (update_many)
+      {"updates": [{"id": .., ...}]}     different fields per transaction (one bulk_write)
+    """
+    data = request.get_json(silent=True) or {}
+    if "updates" in data:
+        return bulk_update_transactions_each(data["updates"])
+
+    try:
+        fields = transaction_update_fields(data.get("set") or {})
+        if not fields:
+            raise ValueError("'set' must contain at least one editable field")
+        query, invalid = bulk_target(data, transaction_filter)
+        if "filter" in data and fields.keys() & TRANSACTION_COUNTED_FIELDS:
+            raise ValueError(
+                "Filter updates can only change: " + ", ".join(sorted(set(TRANSACTION_EDIT_FIELDS) - TRANSACTION_COUNTED_FIELDS))
+            )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    counted = fields.keys() & TRANSACTION_COUNTED_FIELDS
+    before = list(db.transactions.find(query)) if counted else []
+    result = db.transactions.update_many(query, {"$set": fields})
+    apply_transaction_edits((tx, {**tx, **fields}) for tx in before)
+
+    return jsonify({
+        "message": f"{result.modified_count} transaction(s) updated",
+        "matched": result.matched_count,
+        "modified": result.modified_count,
+        "invalidIds": invalid,
+    }), 200
+
+
+def bulk_update_transactions_each(updates):
+    if not isinstance(updates, list) or not updates:
+        return jsonify({"error": "'updates' must be a non-empty list"}), 400
+    if len(updates) > BULK_ADMIN_MAX_IDS:
+        return jsonify({"error": f"At most {BULK_ADMIN_MAX_IDS} updates per request"}), 400
+
+    targets, errors = {}, []
+    for index, item in enumerate(updates):
+        tx_id = item.get("id") if isinstance(item, dict) else None
+        try:
+            object_id = to_object_id(tx_id)
+            fields = transaction_update_fields(item)
+        except (InvalidId, TypeError):
+            errors.append({"index": index, "id": tx_id, "error": "Invalid transaction ID"})
+            continue
+        except ValueError as e:
+            errors.append({"index": index, "id": tx_id, "error": str(e)})
+            continue
+        if not fields:
+            errors.append({"index": index, "id": tx_id, "error": "No editable fields"})
+            continue
+        targets.setdefault(object_id, {}).update(fields)
+
+    matched = modified = 0
+    if targets:
+        counted = [oid for oid, fields in targets.items() if fields.keys() & TRANSACTION_COUNTED_FIELDS]
+        before = list(db.transactions.find({"_id": {"$in": counted}})) if counted else []
+        result = db.transactions.bulk_write(
+            [UpdateOne({"_id": oid}, {"$set": fields}) for oid, fields in targets.items()],
+            ordered=False,
+        )
+        matched, modified = result.matched_count, result.modified_count
+        apply_transaction_edits((tx, {**tx, **targets[tx["_id"]]}) for tx in before)
+
+    return jsonify({
+        "message": f"{modified} transaction(s) updated",
+        "matched": matched,
+        "modified": modified,
+        "notFound": len(targets) - matched,
+        "errors": errors,
+    }), 200
+
+
+METRICS_DEFAULT_DAYS = 30
+METRICS_MAX_DAYS = 366
+
+@admin_blueprint.route("/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Dashboard totals from the precomputed metric documents:
+    users (total/active/blocked), total deposits, balances by account type,
+    transaction volume and the last ?days=N days of daily volume.
+    """
+    try:
+        days = int(request.args.get("days", METRICS_DEFAULT_DAYS))
+    except ValueError:
+        return jsonify({"error": "days must be an integer"}), 400
+    days = max(1, min(days, METRICS_MAX_DAYS))
+    return jsonify(read_metrics(days)), 200
+
+
+@admin_blueprint.route("/cache-stats", methods=["GET"])
+def get_cache_stats():
+    """Hit/miss counters for the user cache in this worker process."""
+    return jsonify({"user_cache": cache_stats()}), 200
+
+
+TRANSACTION_EDIT_FIELDS = [
+    "amount",
+    "type",
+    "beneficiary_name",
+    "beneficiary_account",
+    "beneficiary_bank",
+    "narration",
+    "status",
+    "timestamp",
+]
+# Fields the spending rollups and dashboard counters are derived from
+TRANSACTION_COUNTED_FIELDS = {"amount", "type", "timestamp", "narration"}
+
+
+def parse_transaction_timestamp(value):
+    """Accept a datetime, epoch milliseconds, ISO 8601 or the UI's "Sep 22, 2025 06:16 AM"."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            try:
+                return datetime.strptime(value, "%b %d, %Y %I:%M %p")
+            except ValueError:
+                pass
+    raise ValueError(f"Invalid timestamp format: {value}")
+
+
+def transaction_update_fields(data):
+    """The editable fields present in `data`, amounts and timestamps normalised. Raises ValueError."""
+    update_data = {}
+    for field in TRANSACTION_EDIT_FIELDS:
+        if field in data:
+            value = data[field]
+            if field == "amount":
+                value = parse_money(value, "amount")
+            if field == "timestamp" and value:
+                value = parse_transaction_timestamp(value)
+            update_data[field] = value
+    return update_data
+
+
 @admin_blueprint.route("/transactions/<string:tx_id>", methods=["PATCH"])
 def update_transaction(tx_id):
     try:
@@ -325,63 +1104,26 @@ def update_transaction(tx_id):
         except:
             return jsonify({"error": "Invalid transaction ID"}), 400
 
-        transaction = db.transactions.find_one({"_id": tx_obj_id})
-        if not transaction:
-            return jsonify({"error": "Transaction not found"}), 404
-
-        # ✅ Allowed fields to update (added timestamp)
-        allowed_fields = [
-            "amount",
-            "type",
-            "beneficiary_name",
-            "beneficiary_account",
-            "beneficiary_bank",
-            "narration",
-            "status",
-            "timestamp",  # ✅ included here
-        ]
-
-        update_data = {}
-
-        for field in allowed_fields:
-            if field in data:
-                value = data[field]
-
-                # 🔧 Normalize timestamp to datetime
-                if field == "timestamp" and value:
-                    import datetime
-                    if isinstance(value, datetime.datetime):
-                        update_data["timestamp"] = value
-                    elif isinstance(value, (int, float)):
-                        # assume epoch milliseconds
-                        update_data["timestamp"] = datetime.datetime.fromtimestamp(
-                            value / 1000
-                        )
-                    elif isinstance(value, str):
-                        try:
-                            # try ISO format first
-                            update_data["timestamp"] = datetime.datetime.fromisoformat(
-                                value.replace("Z", "+00:00")
-                            )
-                        except ValueError:
-                            try:
-                                # try your UI’s format "Sep 22, 2025 06:16 AM"
-                                update_data["timestamp"] = datetime.datetime.strptime(
-                                    value, "%b %d, %Y %I:%M %p"
-                                )
-                            except Exception:
-                                return jsonify({"error": f"Invalid timestamp format: {value}"}), 400
-                else:
-                    update_data[field] = value
+        try:
+            update_data = transaction_update_fields(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
+        # One round trip: the pre-image comes back from the update itself
         if update_data:
-            db.transactions.update_one(
+            transaction = db.transactions.find_one_and_update(
                 {"_id": tx_obj_id},
-                {"$set": update_data}
+                {"$set": update_data},
+                return_document=ReturnDocument.BEFORE
             )
+        else:
+            transaction = db.transactions.find_one({"_id": tx_obj_id})
+        if not transaction:
+            return jsonify({"error": "Transaction not found"}), 404
+        updated_tx = {**transaction, **update_data}
 
-        # ✅ Fetch updated transaction
-        updated_tx = db.transactions.find_one({"_id": tx_obj_id})
+        # Keep the spending chart rollups and dashboard counters in step
+        apply_transaction_edits([(transaction, updated_tx)])
 
         # format timestamp safely
         ts_value = None
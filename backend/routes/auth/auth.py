@@ -1,11 +1,46 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import create_access_token
 from backend.extensions import db
+from backend.decorators import rate_limited
+from backend.utils.rate_limit import RATE_LIMIT_LOGIN_IP, RATE_LIMIT_LOGIN_USER
+from backend.utils.passwords import (
+    PasswordPoolBusy, verify_password, burn_verification, rehash_in_background
+)
 
 auth_blueprint = Blueprint("auth", __name__)
 
+IDENTITY_FIELDS = {"email": 1, "password": 1, "role": 1}
+
+
+def find_identities(email: str) -> list:
+    """
+    The admin and/or user account registered under `email`, admin first, in
+    one round trip. Both sides are equality matches on the email_unique indexes.
+    """
+    def lookup(kind):
+        return [
+            {"$match": {"email": email}},
+            {"$limit": 1},
+            {"$project": IDENTITY_FIELDS},
+            {"$addFields": {"_kind": kind}},
+        ]
+
+    accounts = list(db.admins.aggregate(
+        lookup("admin") + [{"$unionWith": {"coll": "users", "pipeline": lookup("user")}}]
+    ))
+    return sorted(accounts, key=lambda account: account["_kind"] != "admin")
+
+
+def login_email():
+    """Bucket login attempts by the targeted account, not just the caller."""
+    data = request.get_json(silent=True)
+    email = data.get("email") if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
 # ---------------- User/Admin Login ----------------
 @auth_blueprint.route("/login", methods=["POST"])
+@rate_limited("login", ip_limit=RATE_LIMIT_LOGIN_IP, user_limit=RATE_LIMIT_LOGIN_USER, user_key=login_email)
 def login():
     data = request.get_json()
     email = data.get("email")
@@ -13,30 +48,36 @@ def login():
 
     if not email or not password:
         return jsonify({"error": "Email and password are required"}), 400
+    if not isinstance(email, str) or not isinstance(password, str):
+        return jsonify({"error": "Invalid email or password"}), 401
+
+    try:
+        accounts = find_identities(email)
+        if not accounts:
+            burn_verification(password)
+
+        # Admins are checked first, as before
+        for account in accounts:
+            ok, needs_rehash = verify_password(password, account.get("password"))
+            if not ok:
+                continue
+            if needs_rehash:
+                collection = db.admins if account["_kind"] == "admin" else db.users
+                rehash_in_background(collection, account["_id"], password, account["password"])
 
-    # First, check the admins collection
-    admin = db.admins.find_one({"email": email})
-    if admin and admin["password"] == password:
-        # ✅ Admins don’t use JWT
-        access_token = create_access_token(identity=str(admin["_id"]))
-        return jsonify({
-            "id": str(admin["_id"]),
-            "email": admin["email"],
-            "role": admin.get("role", "superadmin"),
-            "token": access_token
-        })
-
-    # Then, check the users collection
-    user = db.users.find_one({"email": email})
-    if user and user["password"] == password:
-        # ✅ Users get JWT
-        access_token = create_access_token(identity=str(user["_id"]))
-        return jsonify({
-            "id": str(user["_id"]),
-            "email": user["email"],
-            "role": user.get("role", "user"),  # fallback to "user"
-            "token": access_token
-        })
+            # ✅ Admins and users both get a JWT
+            access_token = create_access_token(identity=str(account["_id"]))
+            default_role = "superadmin" if account["_kind"] == "admin" else "user"
+            return jsonify({
+                "id": str(account["_id"]),
+                "email": account["email"],
+                "role": account.get("role", default_role),
+                "token": access_token
+            })
+    except PasswordPoolBusy:
+        response = jsonify({"error": "Too many login attempts in progress, please retry"})
+        response.headers["Retry-After"] = "1"
+        return response, 503
 
     # If no match
-    return jsonify({"error": "Invalid email or password"}), 401
\ No newline at end of file
+    return jsonify({"error": "Invalid email or password"}), 401
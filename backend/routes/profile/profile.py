@@ -6,6 +6,7 @@ import os
 import uuid
 
 from backend.extensions import db
+from backend.utils.passwords import PasswordPoolBusy, hash_password, verify_password
 
 profile_blueprint = Blueprint("profile", __name__)
 
@@ -56,6 +57,7 @@ def get_user_profile():
             "pin": user.get("pin"),
             "account_number": user.get("accountNumber"),
             "profile_picture": user.get("profile_picture"),
+            "email_digest": bool(user.get("emailDigest")),
         }), 200
 
     except Exception as e:
@@ -114,13 +116,34 @@ def change_password():
     if not old_password or not new_password:
         return jsonify({"error": "Missing required fields"}), 400
 
-    user = db.users.find_one({"_id": user_id})
-    if not user or user.get("password") != old_password:
-        return jsonify({"error": "Invalid old password"}), 401
-
-    db.users.update_one({"_id": user_id}, {"$set": {"password": new_password}})
+    user = db.users.find_one({"_id": user_id}, {"password": 1})
+    try:
+        ok, _ = verify_password(old_password, user.get("password") if user else None)
+        if not ok:
+            return jsonify({"error": "Invalid old password"}), 401
+        new_hash = hash_password(new_password)
+    except PasswordPoolBusy:
+        return jsonify({"error": "Server busy, please retry"}), 503
+
+    db.users.update_one({"_id": user_id}, {"$set": {"password": new_hash}})
     return jsonify({"message": "Password changed successfully"}), 200
 
+@profile_blueprint.route("/notifications", methods=["PATCH"])
+@jwt_required()
+def update_notifications():
+    """Opt in to (or out of) digest emails for small transactions."""
+    user_id = ObjectId(get_jwt_identity())
+    data = request.get_json(silent=True) or {}
+
+    email_digest = data.get("email_digest")
+    if not isinstance(email_digest, bool):
+        return jsonify({"error": "email_digest must be true or false"}), 400
+
+    result = db.users.update_one({"_id": user_id}, {"$set": {"emailDigest": email_digest}})
+    if result.matched_count == 0:
+        return jsonify({"error": "User not found"}), 404
+    return jsonify({"message": "Notification preferences updated", "email_digest": email_digest}), 200
+
 #@profile_blueprint.route('/get-picture', methods=['GET'])
 #@jwt_required()
 #def get_picture():
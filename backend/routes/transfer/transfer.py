@@ -1,33 +1,75 @@
-from flask import current_app
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from backend.extensions import db
 from datetime import datetime
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from backend.decorators import block_check_required
-import hashlib
-
-
+from backend.decorators import block_check_required, rate_limited
+from backend.utils.rate_limit import RATE_LIMIT_TRANSFER_IP, RATE_LIMIT_TRANSFER_USER
+from backend.utils.user_cache import get_user
+from backend.utils.ledger import post_transfer, post_batch, parse_money, InsufficientFunds
+from backend.utils.idempotency import build_record, find_stored_response, is_idempotency_conflict
+from backend.utils.rollups import month_key
+from backend.utils.digests import wants_digest
+from backend.utils.pagination import CountCache, InvalidCursor, keyset_filter, keyset_page, parse_date_range
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+import os
+import io
+import csv
+import json
+
+
+
+def mask_account_number(account_number: str) -> str:
+    if len(account_number) < 6:
+        return account_number  # too short, return as-is
+    return f"{account_number[0]}XX..{account_number[-2]}X"
+
+def transaction_email_payload(account: dict, transaction_type: str, amount: float,
+                              masked_account: str, narration, reference) -> dict:
+    """
+    Payload for send_transaction_email_task, from the account as it looks
+    after the transfer. "digest" routes it to the account's digest email
+    (opted in, below the high-value bypass) instead of its own.
+    """
+    balance = float(account.get("balance", 0))
+    customer_name = f"{account.get('firstName', '')} {account.get('lastName', '')}".strip()
+    return {
+        "email": account.get("email"),
+        "customer_name": customer_name or "Customer",
+        "amount": f"${amount:.2f}",
+        "transaction_type": transaction_type,  # "DEBIT" | "CREDIT"
+        "currency": account.get("currency", "USD"),
+        "maskedAccountNumber": masked_account,
+        "narration": narration or "",
+        "reference": reference,
+        "dateTime": datetime.now().strftime("%d-%b-%Y %H:%M"),
+        "availableBalance": f"{balance:,.2f}",
+        "clearedBalance": f"{balance:,.2f}",
+        "template": "transaction",
+        "accountNumber": account.get("accountNumber"),
+        "status": account.get("status", "Active"),
+        "digest": wants_digest(account, amount),
+    }
 
-def color_from_text(text: str) -> str:
+def replay_response(body: dict, status: int):
     """
-    Generate a consistent HEX color from a string (narration).
+    Return the stored response of an already-processed transfer.
     """
-    hex_digest = hashlib.md5(text.encode("utf-8")).hexdigest()
-    return f"#{hex_digest[:6]}"
+    response = jsonify(body)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response, status
 
 transfer_blueprint = Blueprint('transfer', __name__)
 
 # ----------------- Transfer Endpoint -----------------
 @transfer_blueprint.route('/', methods=['POST'])
 @jwt_required()
+@rate_limited("transfer", ip_limit=RATE_LIMIT_TRANSFER_IP, user_limit=RATE_LIMIT_TRANSFER_USER)
 @block_check_required
 def transfer():
     sender_id = get_jwt_identity()
     data = request.get_json()
     print("📩 Full Incoming Data:", data)
 
-    from backend.tasks.email_tasks import send_transaction_email_task   # 👈 import celery task
-
     from_account = data.get('fromAccount')
     beneficiary_bank = data.get('beneficiaryBank')
     beneficiary_account = data.get('beneficiaryAccount')
@@ -42,20 +84,27 @@ def transfer():
     if not transaction_id:
         return jsonify({"error": "Transaction ID missing"}), 400
 
+    # Replayed request (e.g. frontend retry after a timeout) → return the first result
+    stored = find_stored_response(sender_id, transaction_id)
+    if stored:
+        return replay_response(*stored)
+
     # Validate amount
     try:
-        amount = float(data.get('amount'))
+        amount = parse_money(data.get('amount'), "amount")
         if amount <= 0:
             return jsonify({"error": "Transfer amount must be greater than zero"}), 400
-    except (TypeError, ValueError):
+    except ValueError:
         return jsonify({"error": "Invalid transfer amount"}), 400
 
     # Prevent self-transfer
     if from_account == beneficiary_account:
         return jsonify({"error": "You cannot transfer to the same account"}), 400
 
-    # Find sender
-    sender = db.users.find_one({'accountNumber': from_account})
+    # Find sender (usually the logged-in user, already loaded for this request)
+    sender = get_user(sender_id)
+    if not sender or sender.get('accountNumber') != from_account:
+        sender = db.users.find_one({'accountNumber': from_account})
     if not sender:
         return jsonify({"error": "Contact your Bank, there seems to be a problem with your account"}), 404
 
@@ -63,30 +112,10 @@ def transfer():
     if str(sender['pin']) != str(pin):
         return jsonify({"error": "Invalid pin"}), 401
 
-    # Check balance
-    balance = float(sender['balance'])
-
-    if balance < amount:
-        return jsonify({"error": "Oops! Insufficient balance"}), 400
-
-
-     # ----------------- Helper: Mask Account -----------------
-    def mask_account_number(account_number: str) -> str:
-        if len(account_number) < 6:
-            return account_number  # too short, return as-is
-        return f"{account_number[0]}XX..{account_number[-2]}X"
 
     masked_from_account = mask_account_number(from_account)
     masked_beneficiary_account = mask_account_number(beneficiary_account)
 
-    # Deduct from sender
-    new_balance = int(sender['balance']) - int(amount)
-
-    db.users.update_one(
-        {"accountNumber": from_account},
-        {"$set": {"balance": new_balance}}
-    )
-
     # Build sender full name once
     sender_name = f"{sender.get('firstName', '')} {sender.get('lastName', '')}".strip()
     if not sender_name:
@@ -108,36 +137,13 @@ def transfer():
         'timestamp': datetime.now(),
         'type': 'debit'
     }
-    db.transactions.insert_one(sender_transaction)
-
-    # Enqueue debit email notification
-    try:
-        customer_name = f"{sender.get('firstName', '')} {sender.get('lastName', '')}".strip()
-        if not customer_name:
-            customer_name = "Customer"
-
-        payload = {
-            "email": sender.get("email"),
-            "customer_name": customer_name,
-            "amount": f"${amount:.2f}",
-            "transaction_type": "DEBIT",  # keep consistent with CREDIT
-            "currency": sender.get("currency", "USD"),
-            "maskedAccountNumber": masked_sender_account,
-            "narration": narration,
-            "reference": transaction_id,
-            "dateTime": datetime.now().strftime("%d-%b-%Y %H:%M"),
-            "availableBalance": f"{new_balance:,.2f}",
-            "clearedBalance": f"{new_balance:,.2f}",
-            "template": "transaction",
-            "accountNumber": sender.get("accountNumber"),
-            "status": sender.get("status", "Active"),
-        }
-
-        send_transaction_email_task.delay(payload)
-        
-    except Exception as e:
-        current_app.logger.exception("❌ Failed to enqueue debit email task: %s", e)
 
+    # Credit record (user_id is filled in by the ledger if the beneficiary is internal)
+    credit_transaction = {
+        **sender_transaction,
+        'timestamp': datetime.now(),
+        'type': 'credit'
+    }
 
     # Expense record
     expense = {
@@ -148,58 +154,42 @@ def transfer():
         'category': 'Transfer',
         'timestamp': datetime.now(),
     }
-    db.expenses.insert_one(expense)
-
-    # ----------------- HANDLE CREDIT (if internal) -----------------
-    recipient = db.users.find_one({'accountNumber': beneficiary_account})
-    if recipient:  # ✅ only if beneficiary exists in your system
-        recipient_new_balance = float(recipient['balance']) + amount
-        db.users.update_one(
-            {"accountNumber": beneficiary_account},
-            {"$set": {"balance": recipient_new_balance}}
-        )
 
-        credit_transaction = {
-            'user_id': str(recipient['_id']),  # recipient's user ID
-            'initiator_name': sender_name,   # 👈 added here
-            "transaction_id": transaction_id,
-            'from_account': from_account,
-            'masked_from_account': masked_from_account,
-            'beneficiary_bank': beneficiary_bank,
-            'beneficiary_account': beneficiary_account,
-            'masked_beneficiary_account': masked_beneficiary_account,
-            'beneficiary_name': beneficiary_name,
-            'amount': amount,
-            'narration': narration,
-            'timestamp': datetime.now(),
-            'type': 'credit'
-        }
-        db.transactions.insert_one(credit_transaction)
-    
-    # Enqueue credit email notification
-        try:
-            # Combine firstName and lastName into a full name
-            customer_name = f"{recipient.get('firstName', '')} {recipient.get('lastName', '')}".strip()
-            if not customer_name:
-                customer_name = "Customer"
-
-            payload = {
-                "email": recipient['email'],
-                "customer_name": recipient.get("fullName", "Customer"),
-                "amount": f"${amount:.2f}",
-                "transaction_type": "CREDIT",
-                "currency": "USD",
-                "maskedAccountNumber": masked_beneficiary_account,
-                "narration": narration,
-                "reference": transaction_id,
-                "dateTime": datetime.now().strftime("%d-%b-%Y %H:%M"),
-                "availableBalance": f"{recipient_new_balance:,.2f}",
-                "clearedBalance": f"{recipient_new_balance:,.2f}",
-                "template": "transaction"
-            }
-            send_transaction_email_task.delay(payload)
-        except Exception as e:
-            current_app.logger.exception("❌ Failed to enqueue credit email task: %s", e)
+    response_body = {
+        "message": "Transfer successful",
+        "transaction_id": transaction_id
+    }
+
+    # Email notifications are staged in the outbox with the transfer and
+    # relayed to Celery by `flask outbox relay`, never from the request.
+    def notifications(sender, recipient):
+        payloads = [transaction_email_payload(
+            sender, "DEBIT", amount, masked_from_account, narration, transaction_id
+        )]
+        if recipient:  # ✅ only if beneficiary exists in your system
+            payloads.append(transaction_email_payload(
+                recipient, "CREDIT", amount, masked_beneficiary_account, narration, transaction_id
+            ))
+        return payloads
+
+    # ----------------- Debit + credit in one transaction -----------------
+    try:
+        post_transfer(
+            from_account, beneficiary_account, amount,
+            sender_transaction, credit_transaction, expense,
+            idempotency_record=build_record(sender_id, transaction_id, response_body),
+            notifications=notifications
+        )
+    except InsufficientFunds:
+        return jsonify({"error": "Oops! Insufficient balance"}), 400
+    except DuplicateKeyError as e:
+        if not is_idempotency_conflict(e):
+            raise
+        # A concurrent duplicate committed first
+        stored = find_stored_response(sender_id, transaction_id)
+        if stored:
+            return replay_response(*stored)
+        return jsonify({"error": "Transaction is already being processed"}), 409
 
     # ✅ Save Beneficiary (for both internal & external transfers)
     if save_beneficiary:
@@ -220,65 +210,276 @@ def transfer():
             upsert=True
         )
 
-    return jsonify({
-        "message": "Transfer successful",
-         "transaction_id": transaction_id
-        }), 200
+    return jsonify(response_body), 200
+
+
+
+
+# ----------------- Batch / Payroll Transfer -----------------
+MAX_BATCH_SIZE = int(os.getenv("MAX_TRANSFER_BATCH_SIZE", 500))
+
+
+@transfer_blueprint.route('/batch', methods=['POST'])
+@jwt_required()
+@rate_limited("transfer", ip_limit=RATE_LIMIT_TRANSFER_IP, user_limit=RATE_LIMIT_TRANSFER_USER)
+@block_check_required
+def transfer_batch():
+    """
+    Many transfers from one account in a single request.
+
+    Body: {"fromAccount", "pin", "transfers": [{"beneficiaryBank", "beneficiaryAccount",
+    "beneficiaryName", "amount", "narration", "transactionId"}, ...]}
+
+    The PIN and total funds are checked once; the batch is then applied as one
+    debit, one bulk_write of credits and insert_many for the records and
+    outbox notifications. Each item gets its own entry in "results".
+    """
+    sender_id = get_jwt_identity()
+    data = request.get_json() or {}
+
+    from_account = data.get('fromAccount')
+    pin = data.get('pin')
+    items = data.get('transfers')
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "transfers must be a non-empty list"}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"A batch can hold at most {MAX_BATCH_SIZE} transfers"}), 400
+
+    # Find sender + check PIN once for the whole batch
+    sender = get_user(sender_id)
+    if not sender or sender.get('accountNumber') != from_account:
+        sender = db.users.find_one({'accountNumber': from_account})
+    if not sender:
+        return jsonify({"error": "Contact your Bank, there seems to be a problem with your account"}), 404
+    if str(sender['pin']) != str(pin):
+        return jsonify({"error": "Invalid pin"}), 401
+
+    # ----------------- Validate items -----------------
+    results = [None] * len(items)
+    valid = []  # (index, item, amount)
+    seen_ids = set()
+    for i, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        transaction_id = item.get('transactionId')
+        try:
+            amount = parse_money(item.get('amount'), "amount")  # rejects NaN/inf too
+        except ValueError:
+            amount = None
+
+        error = None
+        if not transaction_id:
+            error = "Transaction ID missing"
+        elif transaction_id in seen_ids:
+            error = "Duplicate transactionId in batch"
+        elif amount is None:
+            error = "Invalid transfer amount"
+        elif amount <= 0:
+            error = "Transfer amount must be greater than zero"
+        elif not item.get('beneficiaryAccount'):
+            error = "Beneficiary account missing"
+        elif item.get('beneficiaryAccount') == from_account:
+            error = "You cannot transfer to the same account"
+
+        if error:
+            results[i] = {"index": i, "transaction_id": transaction_id, "status": "failed", "error": error}
+            continue
+        seen_ids.add(transaction_id)
+        valid.append((i, item, amount))
+
+    # Already-processed transaction IDs (one $in lookup) are reported, not re-run
+    if valid:
+        already_done = {
+            k["transaction_id"] for k in db.idempotency_keys.find(
+                {"user_id": sender_id, "transaction_id": {"$in": [item['transactionId'] for _, item, _ in valid]}},
+                {"transaction_id": 1}
+            )
+        }
+        remaining = []
+        for i, item, amount in valid:
+            if item['transactionId'] in already_done:
+                results[i] = {"index": i, "transaction_id": item['transactionId'], "status": "duplicate"}
+            else:
+                remaining.append((i, item, amount))
+        valid = remaining
+
+    if not valid:
+        return jsonify({"message": "No transfers were processed", "processed": 0, "results": results}), 400
+
+    # ----------------- Build records -----------------
+    total = sum(amount for _, _, amount in valid)
+    sender_name = f"{sender.get('firstName', '')} {sender.get('lastName', '')}".strip() or "Customer"
+    masked_from_account = mask_account_number(from_account)
+
+    beneficiary_accounts = list({item['beneficiaryAccount'] for _, item, _ in valid})
+    internal = {
+        u['accountNumber']: u for u in db.users.find(
+            {"accountNumber": {"$in": beneficiary_accounts}},
+            {"accountNumber": 1}
+        )
+    }
 
+    now = datetime.now()
+    credits = {}
+    transactions = []
+    expenses = []
+    idempotency_records = []
+    for i, item, amount in valid:
+        transaction_id = item['transactionId']
+        beneficiary_account = item['beneficiaryAccount']
+        debit_entry = {
+            'user_id': sender_id,
+            'initiator_name': sender_name,
+            "transaction_id": transaction_id,
+            "batch": True,
+            'from_account': from_account,
+            'masked_from_account': masked_from_account,
+            'beneficiary_bank': item.get('beneficiaryBank'),
+            'beneficiary_account': beneficiary_account,
+            'masked_beneficiary_account': mask_account_number(beneficiary_account),
+            'beneficiary_name': item.get('beneficiaryName'),
+            'amount': amount,
+            'narration': item.get('narration'),
+            'timestamp': now,
+            'type': 'debit'
+        }
+        transactions.append(debit_entry)
+        recipient = internal.get(beneficiary_account)
+        if recipient:
+            credits[beneficiary_account] = credits.get(beneficiary_account, 0) + amount
+            transactions.append({**debit_entry, 'user_id': str(recipient['_id']), 'type': 'credit'})
+        expenses.append({
+            'user_id': sender_id,
+            'accountNumber': from_account,
+            'amount': amount,
+            'narration': item.get('narration'),
+            'category': 'Transfer',
+            'timestamp': now,
+        })
+        idempotency_records.append(build_record(
+            sender_id, transaction_id, {"message": "Transfer successful", "transaction_id": transaction_id}
+        ))
+
+    # Notifications are staged in the outbox inside the batch transaction
+    def notifications(sender, recipients):
+        payloads = []
+        for _, item, amount in valid:
+            payloads.append(transaction_email_payload(
+                sender, "DEBIT", amount, masked_from_account, item.get('narration'), item['transactionId']
+            ))
+            recipient = recipients.get(item['beneficiaryAccount'])
+            if recipient:
+                payloads.append(transaction_email_payload(
+                    recipient, "CREDIT", amount, mask_account_number(item['beneficiaryAccount']),
+                    item.get('narration'), item['transactionId']
+                ))
+        return payloads
+
+    # ----------------- Apply everything in one transaction -----------------
+    try:
+        post_batch(from_account, total, credits, transactions, expenses, idempotency_records,
+                   notifications=notifications)
+    except InsufficientFunds:
+        for i, item, _ in valid:
+            results[i] = {"index": i, "transaction_id": item['transactionId'], "status": "failed",
+                          "error": "Oops! Insufficient balance"}
+        return jsonify({"message": "Insufficient balance for batch", "processed": 0, "results": results}), 400
+    except BulkWriteError as e:  # insert_many of the idempotency records
+        if not is_idempotency_conflict(e):
+            raise
+        return jsonify({"error": "Some transfers in this batch are already being processed, retry the batch"}), 409
+
+    for i, item, _ in valid:
+        results[i] = {"index": i, "transaction_id": item['transactionId'], "status": "success"}
 
+    return jsonify({
+        "message": "Batch processed",
+        "processed": len(valid),
+        "total_amount": total,
+        "results": results
+    }), 200
 
 
 # ----------------- Transaction Summary -----------------
+SUMMARY_DEFAULT_LIMIT = 20
+SUMMARY_MAX_LIMIT = 100
+
+# amount can be stored as a number or a string; anything unparsable counts as 0
+SAFE_AMOUNT = {"$convert": {"input": "$amount", "to": "double", "onError": 0.0, "onNull": 0.0}}
+
+
+def build_summary_pipeline(user_id, skip: int = 0, limit: int = SUMMARY_DEFAULT_LIMIT):
+    """
+    One $facet pass over a user's transactions: income/expense totals,
+    unique debit beneficiaries and a single bounded page of transactions.
+    """
+    return [
+        {"$match": {"user_id": user_id}},
+        {"$facet": {
+            "totals": [
+                {"$group": {"_id": "$type", "total": {"$sum": SAFE_AMOUNT}, "count": {"$sum": 1}}},
+            ],
+            "beneficiaries": [
+                {"$match": {"type": "debit", "beneficiary_account": {"$nin": [None, ""]}}},
+                {"$group": {
+                    "_id": "$beneficiary_account",
+                    "name": {"$first": "$beneficiary_name"},
+                    "bank": {"$first": "$beneficiary_bank"},
+                }},
+                {"$project": {"_id": 0, "account_number": "$_id", "name": 1, "bank": 1}},
+            ],
+            "transactions": [
+                {"$sort": {"timestamp": -1, "_id": -1}},
+                {"$skip": skip},
+                {"$limit": limit},
+                {"$set": {"_id": {"$toString": "$_id"}, "amount": SAFE_AMOUNT}},
+            ],
+        }},
+    ]
+
+
 @transfer_blueprint.route("/transactions/summary", methods=["GET"])
 @jwt_required()
 def get_transaction_summary():
     user_id = get_jwt_identity()
 
-    # Fetch only this user's transactions
-    transactions = list(db.transactions.find({"user_id": user_id}))
-
-    def safe_amount(value):
-        """Convert amount to float safely, default 0 on error."""
-        try:
-            return float(value)
-        except (ValueError, TypeError):
-            return 0.0
-
-    income = sum(safe_amount(t.get("amount", 0)) for t in transactions if t.get("type") == "credit")
-    expenses = sum(safe_amount(t.get("amount", 0)) for t in transactions if t.get("type") == "debit")
+    try:
+        page = max(int(request.args.get("page", 1)), 1)
+        limit = int(request.args.get("limit", SUMMARY_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({"error": "page and limit must be integers"}), 400
+    if limit < 1:
+        limit = SUMMARY_DEFAULT_LIMIT
+    limit = min(limit, SUMMARY_MAX_LIMIT)
+
+    # Totals, beneficiaries and the page are all computed inside MongoDB
+    result = next(db.transactions.aggregate(build_summary_pipeline(user_id, (page - 1) * limit, limit)))
+
+    totals = {t["_id"]: t for t in result["totals"]}
+    income = totals.get("credit", {}).get("total", 0.0)
+    expenses = totals.get("debit", {}).get("total", 0.0)
     net_income = income - expenses
+    total_count = sum(t["count"] for t in result["totals"])
 
-    # Format transactions for JSON response
+    # Format the (bounded) page of transactions for JSON
     formatted_transactions = []
-    for t in transactions:
+    for t in result["transactions"]:
+        ts = t.get("timestamp")
         formatted_transactions.append({
-            **{k: v for k, v in t.items() if k != "_id"},  # copy everything except raw _id
-            "_id": str(t["_id"]),  # ✅ convert ObjectId to string
-            "amount": safe_amount(t.get("amount", 0)),  # ✅ always numeric
-            "timestamp": t["timestamp"].isoformat() if "timestamp" in t else None
+            **t,
+            "timestamp": ts.isoformat() if isinstance(ts, datetime) else ts
         })
 
-    # Collect unique beneficiaries from debit transactions
-    beneficiaries = {}
-    for t in transactions:
-        if t.get("type") == "debit":  # ✅ only outgoing transfers
-            acct = t.get("beneficiary_account")
-            name = t.get("beneficiary_name")
-            bank = t.get("beneficiary_bank")
-
-            if acct and acct not in beneficiaries:
-                beneficiaries[acct] = {
-                    "account_number": acct,
-                    "name": name,
-                    "bank": bank
-                }
-
     return jsonify({
         "income": income,
         "expenses": expenses,
         "net_income": net_income,
         "transactions": formatted_transactions,
-        "beneficiaries": list(beneficiaries.values())  # ✅ unique list
+        "page": page,
+        "limit": limit,
+        "total": total_count,
+        "pages": (total_count + limit - 1) // limit,
+        "beneficiaries": result["beneficiaries"]  # ✅ unique list
     }), 200
 
 
@@ -293,6 +494,25 @@ def get_beneficiaries():
     return jsonify(beneficiaries), 200
 
 # ----------------- Get User Transactions (Paginated) -----------------
+TRANSACTIONS_MAX_LIMIT = 100
+transaction_counts = CountCache(ttl_seconds=30)
+
+
+def format_transaction(t):
+    return {
+        "_id": str(t["_id"]),
+        "transaction_id": t.get("transaction_id"),
+        "from_account": t.get("from_account"),
+        "beneficiary_bank": t.get("beneficiary_bank"),
+        "beneficiary_account": t.get("beneficiary_account"),
+        "beneficiary_name": t.get("beneficiary_name"),
+        "amount": t.get("amount"),
+        "narration": t.get("narration"),
+        "type": t.get("type"),
+        "timestamp": t.get("timestamp").isoformat() if "timestamp" in t else None
+    }
+
+
 @transfer_blueprint.route("/transactions", methods=["GET"])
 @jwt_required()
 @block_check_required
@@ -313,6 +533,34 @@ def get_transactions():
     if txn_type in ["debit", "credit"]:
         query["type"] = txn_type
 
+    # Cursor (keyset) mode: ?cursor= for the first page, then the returned next_cursor
+    if "cursor" in request.args:
+        limit = min(limit, TRANSACTIONS_MAX_LIMIT)
+        page_query = dict(query)
+        token = request.args.get("cursor")
+        if token:
+            try:
+                page_query.update(keyset_filter(token))
+            except InvalidCursor:
+                return jsonify({"error": "Invalid cursor"}), 400
+
+        docs, next_cursor = keyset_page(
+            db.transactions.find(page_query)
+            .sort([("timestamp", -1), ("_id", -1)])
+            .limit(limit + 1),
+            limit
+        )
+
+        response = {
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "transactions": [format_transaction(t) for t in docs]
+        }
+        # Exact total only on request, and cached briefly
+        if request.args.get("include_total", "").lower() in ("1", "true", "yes"):
+            response["total"] = transaction_counts.get_or_count(db.transactions, query)
+        return jsonify(response), 200
+
     # Total count for pagination
     total = db.transactions.count_documents(query)
 
@@ -325,20 +573,7 @@ def get_transactions():
     )
 
     # Format response
-    formatted = []
-    for t in transactions:
-        formatted.append({
-            "_id": str(t["_id"]),
-            "transaction_id": t.get("transaction_id"),
-            "from_account": t.get("from_account"),
-            "beneficiary_bank": t.get("beneficiary_bank"),
-            "beneficiary_account": t.get("beneficiary_account"),
-            "beneficiary_name": t.get("beneficiary_name"),
-            "amount": t.get("amount"),
-            "narration": t.get("narration"),
-            "type": t.get("type"),
-            "timestamp": t.get("timestamp").isoformat() if "timestamp" in t else None
-        })
+    formatted = [format_transaction(t) for t in transactions]
 
     return jsonify({
         "page": page,
@@ -349,6 +584,88 @@ def get_transactions():
     }), 200
 
 
+# ----------------- Statement Export (streaming) -----------------
+EXPORT_FIELDS = [
+    "timestamp", "transaction_id", "type", "amount", "narration",
+    "from_account", "beneficiary_name", "beneficiary_account", "beneficiary_bank",
+]
+EXPORT_BATCH_SIZE = 1000
+
+
+def export_row(t: dict) -> dict:
+    ts = t.get("timestamp")
+    return {
+        **{field: t.get(field) for field in EXPORT_FIELDS},
+        "timestamp": ts.isoformat() if isinstance(ts, datetime) else ts,
+    }
+
+
+@transfer_blueprint.route("/transactions/export", methods=["GET"])
+@jwt_required()
+@block_check_required
+def export_transactions():
+    """
+    Stream the full statement as CSV (default) or NDJSON straight from a Mongo
+    cursor, so memory stays flat no matter how many rows there are.
+    Query params: format=csv|ndjson, start=YYYY-MM-DD, end=YYYY-MM-DD, type=debit|credit
+    """
+    user_id = get_jwt_identity()
+    export_format = request.args.get("format", "csv").lower()
+    if export_format not in ("csv", "ndjson"):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    query = {"user_id": user_id}
+    txn_type = request.args.get("type")
+    if txn_type in ["debit", "credit"]:
+        query["type"] = txn_type
+    try:
+        window = parse_date_range(request.args.get("start"), request.args.get("end"))
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+    if window:
+        query["timestamp"] = window
+
+    cursor = (
+        db.transactions.find(query, {field: 1 for field in EXPORT_FIELDS})
+        .sort([("timestamp", 1), ("_id", 1)])
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for i, t in enumerate(cursor, 1):
+            writer.writerow(export_row(t))
+            if i % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        yield buffer.getvalue()
+
+    def generate_ndjson():
+        chunk = []
+        for t in cursor:
+            chunk.append(json.dumps(export_row(t), default=str))
+            if len(chunk) >= EXPORT_BATCH_SIZE:
+                yield "\n".join(chunk) + "\n"
+                chunk = []
+        if chunk:
+            yield "\n".join(chunk) + "\n"
+
+    if export_format == "csv":
+        body, mimetype = generate_csv(), "text/csv"
+    else:
+        body, mimetype = generate_ndjson(), "application/x-ndjson"
+
+    filename = f"statement-{datetime.now().strftime('%Y%m%d')}.{export_format}"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
 @transfer_blueprint.route("/transactions/spending-chart", methods=["GET", "OPTIONS"])
 def spending_chart_options():
     # Handle the preflight CORS OPTIONS request
@@ -361,28 +678,17 @@ def spending_chart_options():
 def protected_spending_chart():
     user_id = get_jwt_identity()
 
-    now = datetime.utcnow()
-    start_of_month = datetime(now.year, now.month, 1)
-
-    # ✅ fetch only this month’s debit transactions for this user
-    transactions = list(db.transactions.find({
-        "user_id": user_id,
-        "type": "debit",
-        "timestamp": {"$gte": start_of_month}
-    }))
-
-    def safe_amount(value):
-        try:
-            return float(value)
-        except (ValueError, TypeError):
-            return 0.0
+    # ✅ read this month's pre-aggregated rollups (one small doc per narration)
+    rollups = db.spending_rollups.find(
+        {"user_id": user_id, "month": month_key(datetime.now())},
+        {"_id": 0, "narration": 1, "total": 1, "color": 1}
+    )
 
-    # ✅ group spending by narration
     spending_summary = {}
-    for t in transactions:
-        narration = t.get("narration", "Other") or "Other"
-        amount = safe_amount(t.get("amount", 0))
-        spending_summary[narration] = spending_summary.get(narration, 0) + amount
+    colors = {}
+    for r in rollups:
+        spending_summary[r["narration"]] = r.get("total", 0.0)
+        colors[r["narration"]] = r.get("color")
 
     total_spending = sum(spending_summary.values())
 
@@ -398,7 +704,7 @@ def protected_spending_chart():
             chart_data.append({
                 "name": narration,
                 "value": total,
-                "color": color_from_text(narration)
+                "color": colors[narration]
             })
 
     # ✅ add "Other" if needed
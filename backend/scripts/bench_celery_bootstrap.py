@@ -0,0 +1,68 @@
+# backend/scripts/bench_celery_bootstrap.py
+"""
+Worker bootstrap cost: how long building the Flask app takes, and the
+per-task overhead of the old ContextTask (create_app() on every call)
+versus the cached per-process app (an app context push per call).
+
+    ENSURE_INDEXES=false python -m backend.scripts.bench_celery_bootstrap --tasks 2000
+
+Tasks are invoked in-process (task()), the same __call__ the worker runs,
+so no broker is needed. ENSURE_INDEXES=false keeps MongoDB out of the
+measurement; with it on, every create_app() also round-trips to Mongo.
+"""
+import argparse
+import time
+
+from flask import current_app
+
+from backend import create_app
+from backend.celery_app import celery, get_flask_app
+
+
+class LegacyContextTask(celery.Task):
+    """ContextTask as it was: a new Flask app for every task."""
+    abstract = True
+
+    def __call__(self, *args, **kwargs):
+        flask_app = create_app()
+        with flask_app.app_context():
+            return self.run(*args, **kwargs)
+
+
+@celery.task(name="bench.noop")
+def noop_task():
+    return current_app.name
+
+
+@celery.task(name="bench.noop_legacy", base=LegacyContextTask)
+def noop_legacy_task():
+    return current_app.name
+
+
+def per_task_us(task, tasks: int) -> float:
+    started = time.perf_counter()
+    for _ in range(tasks):
+        task()
+    return (time.perf_counter() - started) / tasks * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--legacy-tasks", type=int, default=50, help="fewer: each one builds an app")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    get_flask_app()
+    first = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    get_flask_app()
+    cached = (time.perf_counter() - started) * 1e6
+
+    legacy = per_task_us(noop_legacy_task, args.legacy_tasks)
+    current = per_task_us(noop_task, args.tasks)
+
+    print(f"{'app build (first task)':<28} {first:>10,.1f} ms")
+    print(f"{'app lookup (cached)':<28} {cached:>10,.1f} µs")
+    print(f"{'per task, create_app()':<28} {legacy:>10,.1f} µs   ({args.legacy_tasks} tasks)")
+    print(f"{'per task, cached app':<28} {current:>10,.1f} µs   ({args.tasks} tasks, {legacy / current:,.0f}x less)")
@@ -0,0 +1,95 @@
+# backend/scripts/bench_email_render.py
+"""
+Transaction email renders per second: the old per-task path (exists + read
++ jinja2.Template() on every email) versus the cached TemplateRegistry.
+
+    python -m backend.scripts.bench_email_render --renders 20000
+
+Uses a throwaway precompiled transaction template (about the size of a
+real MJML-generated email) in a temp directory, so MJML conversion is not
+part of the measurement.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+from jinja2 import Template
+
+from backend.utils.email_templates import TemplateRegistry
+
+CONTEXT = {
+    "customer_name": "Ada Obi",
+    "amount": "$1,250.00",
+    "transaction_type": "DEBIT",
+    "currency": "USD",
+    "maskedAccountNumber": "00103****567",
+    "narration": "Rent September",
+    "reference": "TXN-20250922-0001",
+    "dateTime": "22-Sep-2025 06:16",
+    "availableBalance": "48,750.00",
+    "clearedBalance": "48,750.00",
+    "balance": "48,750.00",
+    "status": "Successful",
+    "date": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC"),
+}
+
+ROW = """
+<tr><td style="padding:8px 24px;font-family:Arial,sans-serif;font-size:14px;color:#555555;">{label}</td>
+<td style="padding:8px 24px;font-family:Arial,sans-serif;font-size:14px;color:#111111;text-align:right;">{{{{ {field} }}}}</td></tr>"""
+
+
+def sample_template() -> str:
+    rows = "".join(ROW.format(label=k, field=k) for k in CONTEXT)
+    body = f"""<!doctype html><html><head><meta charset="utf-8"><title>Transaction Alert</title>
+<style>{'.c{margin:0;padding:0}' * 150}</style></head><body>
+<table role="presentation" width="100%" cellpadding="0" cellspacing="0">
+<tr><td><h1>{{% if transaction_type == "DEBIT" %}}Debit{{% else %}}Credit{{% endif %}} Alert</h1>
+<p>Dear {{{{ customer_name|title }}}},</p></td></tr>{rows * 4}
+{{% for line in ["Never share your PIN.", "Contact support if this wasn't you."] %}}<tr><td>{{{{ line }}}}</td></tr>{{% endfor %}}
+</table></body></html>"""
+    return body
+
+
+def old_render(path: str) -> str:
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return Template(f.read()).render(**CONTEXT)
+    return None
+
+
+def rate(fn, renders: int) -> float:
+    started = time.perf_counter()
+    for _ in range(renders):
+        fn()
+    return renders / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=5000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-email-")
+    try:
+        os.makedirs(os.path.join(workdir, "templates", "compiled"))
+        path = os.path.join(workdir, "templates", "compiled", "transaction.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(sample_template())
+
+        registry = TemplateRegistry(
+            search_path=os.path.join(workdir, "templates"),
+            bytecode_dir=os.path.join(workdir, "bytecode"),
+        )
+        assert registry.render("transaction", **CONTEXT) == old_render(path)
+
+        before = rate(lambda: old_render(path), args.renders)
+        after = rate(lambda: registry.render("transaction", **CONTEXT), args.renders)
+        print(f"template size: {os.path.getsize(path):,} bytes, {args.renders:,} renders")
+        print(f"{'per-task Template()':<22} {before:>10,.0f} renders/s")
+        print(f"{'TemplateRegistry':<22} {after:>10,.0f} renders/s   ({after / before:.1f}x)")
+        print(f"registry stats: {registry.stats}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,80 @@
+# backend/scripts/bench_login.py
+"""
+Logins per second (and per core) for the bcrypt verification pool.
+
+    python -m backend.scripts.bench_login --rounds 10 12 --clients 32 --seconds 10
+    MONGO_URI=mongodb://localhost:27017 python -m backend.scripts.bench_login --db
+
+PASSWORD_POOL_WORKERS / PASSWORD_POOL_QUEUE size the pool as in the app.
+With --db every login also does the single find_identities() round trip
+against a throwaway user, which is removed at the end.
+"""
+import argparse
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.utils import passwords
+from backend.utils.passwords import PasswordPoolBusy, verify_password
+
+PASSWORD = "correct horse battery staple"
+
+
+def run(rounds: int, clients: int, seconds: float, lookup=None):
+    stored = passwords._hash(PASSWORD, rounds)
+    deadline = time.perf_counter() + seconds
+    counts = {"ok": 0, "busy": 0}
+    lock = threading.Lock()
+
+    def client():
+        ok = busy = 0
+        while time.perf_counter() < deadline:
+            account_password = lookup() if lookup else stored
+            try:
+                if verify_password(PASSWORD, account_password)[0]:
+                    ok += 1
+            except PasswordPoolBusy:
+                busy += 1
+        with lock:
+            counts["ok"] += ok
+            counts["busy"] += busy
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for _ in range(clients):
+            pool.submit(client)
+    elapsed = time.perf_counter() - started
+    return counts["ok"] / elapsed, counts["busy"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[passwords.PASSWORD_HASH_ROUNDS])
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent request threads")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--db", action="store_true", help="Include the identity lookup round trip")
+    args = parser.parse_args()
+
+    cores = min(passwords.PASSWORD_POOL_WORKERS, os.cpu_count() or 1)
+    print(f"pool workers={passwords.PASSWORD_POOL_WORKERS} queue={passwords.PASSWORD_POOL_QUEUE} "
+          f"cores={os.cpu_count()} clients={args.clients}")
+    print(f"{'rounds':>6} {'logins/s':>10} {'per core':>10} {'shed (503)':>11}")
+
+    for rounds in args.rounds:
+        lookup, cleanup = None, None
+        if args.db:
+            from backend.extensions import db
+            from backend.routes.auth.auth import find_identities
+            email = f"bench-login-{uuid.uuid4().hex[:8]}@example.com"
+            db.users.insert_one({"email": email, "password": passwords._hash(PASSWORD, rounds), "bench": email})
+            lookup = lambda: find_identities(email)[0]["password"]
+            cleanup = lambda: db.users.delete_many({"bench": email})
+
+        try:
+            rate, busy = run(rounds, args.clients, args.seconds, lookup)
+        finally:
+            if cleanup:
+                cleanup()
+        print(f"{rounds:>6} {rate:>10.1f} {rate / cores:>10.1f} {busy:>11}")
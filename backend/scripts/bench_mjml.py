@@ -0,0 +1,60 @@
+# backend/scripts/bench_mjml.py
+"""
+MJML -> HTML conversions per second: one `mjml` CLI process per email
+(mjml_to_html_via_cli) versus the long-lived renderer (mjml_to_html).
+
+    cd backend && npm install && PATH="$PWD/node_modules/.bin:$PATH" \
+        python -m backend.scripts.bench_mjml --renders 200
+
+The CLI path needs `mjml` on PATH; the renderer needs node and the mjml
+package in backend/node_modules.
+"""
+import argparse
+import time
+
+from backend.utils.mjml_converter import mjml_to_html_via_cli
+from backend.utils.mjml_renderer import MjmlRenderer
+
+SAMPLE = """<mjml>
+  <mj-head><mj-title>Transaction Alert</mj-title><mj-preview>{n}</mj-preview></mj-head>
+  <mj-body background-color="#f4f4f4">
+    <mj-section background-color="#BF0A30"><mj-column>
+      <mj-text color="#ffffff" font-size="20px">TrustyFin Transaction Alert</mj-text>
+    </mj-column></mj-section>
+    <mj-section background-color="#ffffff"><mj-column>
+      <mj-text>Dear Ada Obi,</mj-text>
+      <mj-text>A DEBIT of $1,250.00 (#{n}) occurred on account 00103****567.</mj-text>
+      <mj-table>
+        <tr><td>Narration</td><td>Rent September</td></tr>
+        <tr><td>Reference</td><td>TXN-20250922-{n:04d}</td></tr>
+        <tr><td>Available balance</td><td>48,750.00</td></tr>
+      </mj-table>
+      <mj-button href="https://example.com">View transaction</mj-button>
+    </mj-column></mj-section>
+  </mj-body>
+</mjml>"""
+
+
+def rate(convert, renders: int) -> float:
+    started = time.perf_counter()
+    for n in range(renders):
+        convert(SAMPLE.format(n=n))
+    return renders / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=100)
+    args = parser.parse_args()
+
+    renderer = MjmlRenderer()
+    try:
+        renderer.render(SAMPLE.format(n=0))  # warm-up: start Node, load mjml
+        cli = rate(mjml_to_html_via_cli, args.renders)
+        persistent = rate(renderer.render, args.renders)
+    finally:
+        renderer.close()
+
+    print(f"{args.renders} conversions")
+    print(f"{'CLI per email':<22} {cli:>10,.1f} renders/s")
+    print(f"{'persistent renderer':<22} {persistent:>10,.1f} renders/s   ({persistent / cli:.1f}x)")
@@ -0,0 +1,124 @@
+# backend/scripts/bench_smtp.py
+"""
+Messages per second: Flask-Mail's mail.send (new connection per message)
+versus the pooled send_mail, against a local SMTP stand-in.
+
+    python -m backend.scripts.bench_smtp --messages 500 --handshake-ms 60
+
+By default a minimal in-process SMTP sink is started; --handshake-ms delays
+its greeting to stand in for the TCP + STARTTLS + AUTH round trips to a real
+provider, and --drop-after makes it hang up every N messages without
+warning (exercises stale-connection recovery). To use aiosmtpd instead:
+
+    python -m aiosmtpd -n -l 127.0.0.1:8025 &
+    python -m backend.scripts.bench_smtp --port 8025
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+from flask import Flask
+from flask_mail import Mail, Message
+
+from backend.utils.smtp_pool import SmtpPool
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept mail: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+
+    def reply(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        time.sleep(server.handshake)
+        self.reply("220 bench-smtp ready")
+        accepted = 0
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line[:4].upper()
+            if verb in (b"EHLO", b"HELO"):
+                self.reply("250 bench-smtp")
+            elif verb == b"DATA":
+                self.reply("354 end with <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                self.reply("250 queued")
+                with server.lock:
+                    server.received += 1
+                accepted += 1
+                if server.drop_after and accepted >= server.drop_after:
+                    return  # hang up without a 421, like an idle-timeout on the provider side
+            elif verb == b"QUIT":
+                self.reply("221 bye")
+                return
+            else:  # MAIL, RCPT, RSET, NOOP
+                self.reply("250 ok")
+
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, handshake: float, drop_after: int):
+        super().__init__(address, SinkHandler)
+        self.handshake = handshake
+        self.drop_after = drop_after
+        self.received = 0
+        self.lock = threading.Lock()
+
+
+def message(n: int) -> Message:
+    return Message(
+        subject=f"Transaction Alert: DEBIT of $1,250.00 (#{n})",
+        recipients=["ada@example.com"],
+        html="<p>" + "A debit occurred on account 00103****567. " * 40 + "</p>",
+    )
+
+
+def rate(send, messages: int) -> float:
+    started = time.perf_counter()
+    for n in range(messages):
+        send(message(n))
+    return messages / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="use an already running SMTP server instead of the sink")
+    parser.add_argument("--handshake-ms", type=float, default=50, help="sink greeting delay per connection")
+    parser.add_argument("--drop-after", type=int, default=0, help="sink hangs up every N messages")
+    parser.add_argument("--max-per-connection", type=int, default=100)
+    args = parser.parse_args()
+
+    sink = None
+    port = args.port
+    if port is None:
+        sink = SinkServer((args.host, 0), args.handshake_ms / 1000, args.drop_after)
+        port = sink.server_address[1]
+        threading.Thread(target=sink.serve_forever, daemon=True).start()
+
+    app = Flask(__name__)
+    app.config.update(MAIL_SERVER=args.host, MAIL_PORT=port, MAIL_DEFAULT_SENDER="alerts@trustyfin.test")
+    mail = Mail(app)
+    try:
+        with app.app_context():
+            pool = SmtpPool(app.extensions["mail"], max_messages=args.max_per_connection)
+            per_message = rate(mail.send, args.messages)
+            pooled = rate(pool.send, args.messages)
+            pool.close()
+    finally:
+        if sink:
+            sink.shutdown()
+
+    print(f"{args.messages} messages to {args.host}:{port}")
+    print(f"{'mail.send per message':<24} {per_message:>10,.1f} msg/s")
+    print(f"{'pooled send_mail':<24} {pooled:>10,.1f} msg/s   ({pooled / per_message:.1f}x)")
+    print(f"pool stats: {pool.stats}")
+    if sink:
+        print(f"sink received {sink.received} of {2 * args.messages}")
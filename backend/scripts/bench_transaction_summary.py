@@ -0,0 +1,91 @@
+# backend/scripts/bench_transaction_summary.py
+"""
+Compare the old in-Python transaction summary with the $facet pipeline
+for users with 1k, 100k and 1M transactions.
+
+    MONGO_URI=mongodb://localhost:27017 \
+        python -m backend.scripts.bench_transaction_summary --sizes 1000 100000 1000000
+
+Seeded documents are tagged and removed when the run finishes.
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from backend.extensions import db
+from backend.routes.transfer.transfer import build_summary_pipeline
+
+CHUNK = 10_000
+
+
+def seed(user_id: str, count: int, tag: str):
+    start = datetime.now() - timedelta(days=3650)
+    written = 0
+    while written < count:
+        batch = []
+        for i in range(written, min(written + CHUNK, count)):
+            batch.append({
+                "user_id": user_id,
+                "transaction_id": f"{tag}-{i}",
+                "beneficiary_account": f"00103{random.randint(0, 499):07d}",
+                "beneficiary_name": "Bench Beneficiary",
+                "beneficiary_bank": "Bench Bank",
+                "amount": round(random.uniform(1, 500), 2),
+                "narration": random.choice(["Rent", "Food", "Fuel", "Salary", "Other"]),
+                "timestamp": start + timedelta(seconds=i * 60),
+                "type": random.choice(["debit", "credit"]),
+                "bench": tag,
+            })
+        db.transactions.insert_many(batch, ordered=False)
+        written += len(batch)
+
+
+def legacy_summary(user_id):
+    """The previous implementation: load everything, then sum in Python."""
+    transactions = list(db.transactions.find({"user_id": user_id}))
+    income = sum(float(t.get("amount", 0)) for t in transactions if t.get("type") == "credit")
+    expenses = sum(float(t.get("amount", 0)) for t in transactions if t.get("type") == "debit")
+    formatted = [{**t, "_id": str(t["_id"]), "timestamp": t["timestamp"].isoformat()} for t in transactions]
+    beneficiaries = {}
+    for t in transactions:
+        if t.get("type") == "debit" and t.get("beneficiary_account") not in beneficiaries:
+            beneficiaries[t["beneficiary_account"]] = t.get("beneficiary_name")
+    return income, expenses, len(formatted), len(beneficiaries)
+
+
+def pipeline_summary(user_id):
+    result = next(db.transactions.aggregate(build_summary_pipeline(user_id)))
+    totals = {t["_id"]: t["total"] for t in result["totals"]}
+    return totals.get("credit", 0.0), totals.get("debit", 0.0), len(result["transactions"]), len(result["beneficiaries"])
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--skip-legacy-above", type=int, default=1_000_000,
+                        help="don't run the in-memory version for larger users")
+    args = parser.parse_args()
+
+    tag = uuid.uuid4().hex[:8]
+    try:
+        print(f"{'transactions':>12} | {'legacy (s)':>10} | {'pipeline (s)':>12}")
+        for size in args.sizes:
+            user_id = f"bench-{tag}-{size}"
+            seed(user_id, size, tag)
+            legacy = timed(legacy_summary, user_id) if size <= args.skip_legacy_above else None
+            pipeline = timed(pipeline_summary, user_id)
+            legacy_str = f"{legacy:10.3f}" if legacy is not None else f"{'skipped':>10}"
+            print(f"{size:>12,} | {legacy_str} | {pipeline:12.3f}")
+    finally:
+        db.transactions.delete_many({"bench": tag})
@@ -0,0 +1,105 @@
+# backend/scripts/bench_transfer_concurrency.py
+"""
+Fire parallel transfers at one hot account and check nothing was lost.
+
+    MONGO_URI=mongodb://localhost:27017/?replicaSet=rs0 \
+        python -m backend.scripts.bench_transfer_concurrency --workers 32 --transfers 2000
+
+Point MONGO_URI at a scratch replica set (transactions need one). The script
+creates two throwaway accounts, drains the sender with concurrent transfers
+and removes everything it wrote afterwards, including its spending rollups
+and its share of the dashboard counters.
+"""
+import argparse
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from backend.extensions import db
+from backend.utils.ledger import post_transfer, InsufficientFunds
+from backend.utils.metrics import apply_deltas, merge_deltas, balance_deltas, transaction_deltas
+
+
+def cleanup(tag: str):
+    """Delete the run's records and take its increments back out of the metrics."""
+    users = list(db.users.find({"bench": tag}, {"accountType": 1, "balance": 1, "opening_balance": 1}))
+    transactions = list(db.transactions.find({"bench": tag}, {"type": 1, "amount": 1, "timestamp": 1}))
+    apply_deltas(merge_deltas(
+        # post_transfer moved balances and counted every record; the users themselves were never counted
+        *(balance_deltas(u.get("accountType"), u["opening_balance"] - u["balance"]) for u in users),
+        *(transaction_deltas(tx, -1) for tx in transactions),
+    ))
+    db.spending_rollups.delete_many({"user_id": f"bench-{tag}"})
+    db.users.delete_many({"bench": tag})
+    db.transactions.delete_many({"bench": tag})
+    db.expenses.delete_many({"bench": tag})
+
+
+def run(workers: int, transfers: int, amount: float, opening_balance: float):
+    tag = uuid.uuid4().hex[:8]
+    sender_acct = f"BENCH{tag}S"
+    recipient_acct = f"BENCH{tag}R"
+    db.users.insert_many([
+        {"accountNumber": sender_acct, "balance": opening_balance, "opening_balance": opening_balance,
+         "email": f"bench-{tag}-s@example.com", "bench": tag},
+        {"accountNumber": recipient_acct, "balance": 0.0, "opening_balance": 0.0,
+         "email": f"bench-{tag}-r@example.com", "bench": tag},
+    ])
+
+    def one_transfer(i):
+        entry = {
+            "user_id": f"bench-{tag}",
+            "transaction_id": f"{tag}-{i}",
+            "from_account": sender_acct,
+            "beneficiary_account": recipient_acct,
+            "amount": amount,
+            "timestamp": datetime.now(),
+            "type": "debit",
+            "bench": tag,
+        }
+        expense = {"user_id": f"bench-{tag}", "amount": amount, "bench": tag}
+        try:
+            post_transfer(sender_acct, recipient_acct, amount, entry, {**entry, "type": "credit"}, expense)
+            return True
+        except InsufficientFunds:
+            return False
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(one_transfer, range(transfers)))
+        elapsed = time.perf_counter() - started
+
+        ok = sum(results)
+        sender = db.users.find_one({"accountNumber": sender_acct})
+        recipient = db.users.find_one({"accountNumber": recipient_acct})
+        expected_sender = opening_balance - ok * amount
+
+        print(f"transfers attempted : {transfers} ({workers} workers)")
+        print(f"succeeded / rejected: {ok} / {transfers - ok}")
+        print(f"elapsed             : {elapsed:.2f}s ({transfers / elapsed:,.0f} transfers/s)")
+        print(f"sender balance      : {sender['balance']:.2f} (expected {expected_sender:.2f})")
+        print(f"recipient balance   : {recipient['balance']:.2f} (expected {ok * amount:.2f})")
+
+        consistent = (
+            abs(sender["balance"] - expected_sender) < 1e-6
+            and abs(recipient["balance"] - ok * amount) < 1e-6
+            and sender["balance"] >= 0
+        )
+        print("✅ balances consistent" if consistent else "❌ lost or duplicated updates")
+    finally:
+        cleanup(tag)
+    return consistent
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--transfers", type=int, default=1000)
+    parser.add_argument("--amount", type=float, default=1.0)
+    parser.add_argument("--opening-balance", type=float, default=500.0,
+                        help="keep below transfers * amount to exercise the insufficient-funds guard")
+    args = parser.parse_args()
+    ok = run(args.workers, args.transfers, args.amount, args.opening_balance)
+    raise SystemExit(0 if ok else 1)
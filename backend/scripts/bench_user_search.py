@@ -0,0 +1,90 @@
+# backend/scripts/bench_user_search.py
+"""
+Typeahead latency of the indexed search_keys prefix search versus the
+case-insensitive regex over raw fields an admin search would otherwise use.
+
+    MONGO_URI=mongodb://localhost:27017 \
+        python -m backend.scripts.bench_user_search --users 1000000
+
+Make sure indexes exist first (`flask indexes apply`). Seeded users are
+tagged and removed at the end.
+"""
+import argparse
+import random
+import re
+import statistics
+import string
+import time
+import uuid
+
+from backend.extensions import db
+from backend.utils.search import search_keys, search_query
+
+FIRST_NAMES = ["james", "mary", "john", "patricia", "robert", "jennifer", "michael", "linda", "david", "amara",
+               "chinedu", "fatima", "kwame", "ngozi", "tunde", "zainab"]
+LAST_NAMES = ["smith", "johnson", "williams", "brown", "okafor", "adeyemi", "mensah", "garcia", "nguyen", "khan"]
+CHUNK = 10_000
+
+
+def seed(count: int, tag: str):
+    written = 0
+    while written < count:
+        batch = []
+        for i in range(written, min(written + CHUNK, count)):
+            first, last = random.choice(FIRST_NAMES), random.choice(LAST_NAMES)
+            user = {
+                "firstName": first.title(),
+                "lastName": last.title(),
+                "email": f"{first}.{last}.{i}.{tag}@example.com",
+                "accountNumber": f"9{tag[:4]}{i:07d}",
+                "bench": tag,
+            }
+            user["search_keys"] = search_keys(user)
+            batch.append(user)
+        db.users.insert_many(batch, ordered=False)
+        written += len(batch)
+
+
+def unindexed_query(q: str) -> dict:
+    pattern = re.compile(re.escape(q), re.IGNORECASE)
+    return {"$or": [{"firstName": pattern}, {"lastName": pattern}, {"email": pattern}, {"accountNumber": pattern}]}
+
+
+def latencies(build_query, queries, limit=10):
+    samples = []
+    for q in queries:
+        started = time.perf_counter()
+        list(db.users.find(build_query(q), {"_id": 1}).limit(limit))
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    tag = uuid.uuid4().hex[:8]
+    try:
+        seed(args.users, tag)
+        queries = []
+        for _ in range(args.queries):
+            kind = random.random()
+            if kind < 0.4:
+                queries.append(random.choice(FIRST_NAMES)[:random.randint(2, 4)])
+            elif kind < 0.7:
+                queries.append(f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)[:2]}")
+            elif kind < 0.9:
+                queries.append(f"9{tag[:4]}{random.randint(0, args.users - 1):07d}"[:8])
+            else:
+                queries.append("".join(random.choices(string.ascii_lowercase, k=3)))
+
+        print(f"{args.users:,} users, {args.queries} typeahead queries (ms)")
+        print(f"{'':<22} {'p50':>8} {'p95':>8}")
+        for label, build in (("indexed search_keys", search_query), ("unindexed $regex/i", unindexed_query)):
+            p50, p95 = latencies(build, queries)
+            print(f"{label:<22} {p50:8.2f} {p95:8.2f}")
+    finally:
+        db.users.delete_many({"bench": tag})
@@ -0,0 +1,50 @@
+// backend/scripts/mjml_worker.js
+// Long-lived MJML renderer driven by backend/utils/mjml_renderer.py.
+// Frames in both directions: 4-byte big-endian length + UTF-8 JSON.
+//   request:  {"id": 1, "mjml": "<mjml>...</mjml>", "options": {...}}
+//   response: {"id": 1, "html": "...", "errors": [...]}  or  {"id": 1, "error": "..."}
+const mjml2html = require("mjml");
+
+// stdout carries frames only; anything MJML logs goes to stderr
+const out = process.stdout;
+console.log = console.info = console.warn = (...args) => process.stderr.write(args.join(" ") + "\n");
+
+function send(reply) {
+  const body = Buffer.from(JSON.stringify(reply), "utf8");
+  const header = Buffer.alloc(4);
+  header.writeUInt32BE(body.length, 0);
+  out.write(Buffer.concat([header, body]));
+}
+
+function handle(request) {
+  Promise.resolve()
+    .then(() => mjml2html(request.mjml, request.options || {}))
+    .then(result => send({
+      id: request.id,
+      html: result.html,
+      errors: (result.errors || []).map(e => e.formattedMessage || String(e)),
+    }))
+    .catch(err => send({ id: request.id, error: String((err && err.message) || err) }));
+}
+
+let buffer = Buffer.alloc(0);
+process.stdin.on("data", chunk => {
+  buffer = Buffer.concat([buffer, chunk]);
+  while (buffer.length >= 4) {
+    const size = buffer.readUInt32BE(0);
+    if (buffer.length < 4 + size) break;
+    const frame = buffer.subarray(4, 4 + size);
+    buffer = buffer.subarray(4 + size);
+    let request;
+    try {
+      request = JSON.parse(frame.toString("utf8"));
+    } catch (err) {
+      send({ id: null, error: `Bad frame: ${err.message}` });
+      continue;
+    }
+    handle(request);
+  }
+});
+
+// Parent went away: exit instead of lingering
+process.stdin.on("end", () => process.exit(0));
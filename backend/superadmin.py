@@ -1,4 +1,5 @@
 from .extensions import db
+from .utils.passwords import hash_password
 from datetime import datetime
 
 
@@ -8,7 +9,7 @@ def ensure_super_admin(db):
         superadmin_data = {
             "username": "superadmin",
             "email": "superadmin@db.com",
-            "password": "SuperSecurePassword123",  # hash it!
+            "password": hash_password("SuperSecurePassword123"),
             "full_name": "Super Admin",
             "role": "superadmin",
             "permissions": {
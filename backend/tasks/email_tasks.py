@@ -1,18 +1,14 @@
 # yourapp/tasks/email_tasks.py
-import os
 from datetime import datetime
-from jinja2 import Template
 from flask_mail import Message
 from flask import current_app
 from marshmallow import Schema, fields, ValidationError
 import bleach
-from backend.celery_app import make_celery
-from flask import current_app
-from backend.extensions import mail
-from backend.utils.mjml_converter import mjml_to_html_via_cli, get_precompiled_html
+from backend.celery_app import celery, PRIORITY_ALERTS, PRIORITY_DIGESTS
+from backend.utils.smtp_pool import send_mail
+from backend.utils.email_templates import render_email
 
 
-celery = make_celery(current_app)
 # Schema for validating incoming payloads
 class TransactionSchema(Schema):
     email = fields.Email(required=True)
@@ -29,12 +25,17 @@ class TransactionSchema(Schema):
     template = fields.Str(missing="transaction")  # default template
     accountNumber = fields.Str(required=True)
     status = fields.Str(required=True)
+    digest = fields.Bool(missing=False)  # buffered for the recipient's digest (see utils/digests.py)
 
 def sanitize(value: str) -> str:
     # allow simple text formatting; strip scripts etc
     return bleach.clean(value, strip=True)
 
-@celery.task(bind=True, max_retries=5, autoretry_for=(Exception,), retry_backoff=True, retry_backoff_max=600)
+def sanitized_fields(data: dict) -> dict:
+    return {field: sanitize(value) for field, value in data.items() if isinstance(value, str)}
+
+@celery.task(bind=True, max_retries=5, autoretry_for=(Exception,), retry_backoff=True, retry_backoff_max=600,
+             ignore_result=True, priority=PRIORITY_ALERTS)
 def send_transaction_email_task(self, payload: dict):
     """
     Asynchronous task to render MJML -> HTML and send email.
@@ -48,41 +49,16 @@ def send_transaction_email_task(self, payload: dict):
         raise
 
     recipient = data["email"]
-    # sanitize user-provided fields
-    customer_name = sanitize(data["customer_name"])
-    amount = sanitize(data["amount"])
-    transaction_type = sanitize(data["transaction_type"])
-    balance = sanitize(data["balance"])
+    # sanitize user-provided fields; every payload field is available to the template
+    context = sanitized_fields(data)
+    context.setdefault("balance", context["availableBalance"])
+    context["date"] = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
+    amount = context["amount"]
+    transaction_type = context["transaction_type"]
     template_name = data.get("template", "transaction")
 
-    # Try precompiled HTML first
-    compiled_html = get_precompiled_html(template_name)
-    if compiled_html:
-        html = Template(compiled_html).render(
-            customer_name=customer_name,
-            amount=amount,
-            transaction_type=transaction_type,
-            balance=balance,
-            date=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
-        )
-    else:
-        # load MJML template, render with Jinja, then convert
-        tpl_path = os.path.join(
-            current_app.root_path, "templates", "email", f"{template_name}.mjml"
-        )
-        if not os.path.exists(tpl_path):
-            raise RuntimeError(f"Template not found: {tpl_path}")
-        with open(tpl_path, "r", encoding="utf-8") as f:
-            mjml_tpl = f.read()
-        rendered_mjml = Template(mjml_tpl).render(
-            customer_name=customer_name,
-            amount=amount,
-            transaction_type=transaction_type,
-            balance=balance,
-            date=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
-        )
-        # Convert to HTML using mjml CLI
-        html = mjml_to_html_via_cli(rendered_mjml)
+    # Compiled once per worker (precompiled HTML if present, else MJML + conversion)
+    html = render_email(template_name, **context)
 
     # Build and send email
     subject = f"Transaction Alert: {transaction_type} of {amount}"
@@ -93,9 +69,55 @@ def send_transaction_email_task(self, payload: dict):
     )
 
     try:
-        mail.send(msg)
+        send_mail(msg)  # pooled, authenticated connection reused across tasks
         current_app.logger.info("Sent transaction email to %s for %s", recipient, transaction_type)
     except Exception as exc:
         current_app.logger.exception("Failed to send email to %s: %s", recipient, exc)
         # Let celery retry it
         raise
+
+
+@celery.task(bind=True, max_retries=5, autoretry_for=(Exception,), retry_backoff=True, retry_backoff_max=600,
+             ignore_result=True, priority=PRIORITY_DIGESTS)
+def send_digest_email_task(self, email: str, total: int, payloads: list):
+    """
+    One email listing every transaction buffered for `email` during its
+    digest window. `total` can exceed len(payloads): only the most recent
+    NOTIFY_DIGEST_MAX_ITEMS are kept.
+    """
+    schema = TransactionSchema(many=True)
+    try:
+        items = schema.load(payloads)
+    except ValidationError as e:
+        current_app.logger.error("Invalid payload for send_digest_email_task: %s", e.messages)
+        raise
+    if not items:
+        return
+
+    rows = [sanitized_fields(item) for item in items]
+    latest = rows[-1]  # balances as of the last transaction in the window
+    context = {
+        **latest,
+        "balance": latest["availableBalance"],
+        "transactions": rows,
+        "count": total,
+        "omitted": max(total - len(rows), 0),
+        "credits": sum(1 for row in rows if row["transaction_type"] == "CREDIT"),
+        "debits": sum(1 for row in rows if row["transaction_type"] == "DEBIT"),
+        "date": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC"),
+    }
+    html = render_email("digest", **context)
+
+    msg = Message(
+        subject=f"Transaction Digest: {total} transaction{'s' if total != 1 else ''}",
+        recipients=[email],
+        html=html
+    )
+
+    try:
+        send_mail(msg)
+        current_app.logger.info("Sent digest email to %s covering %s transaction(s)", email, total)
+    except Exception as exc:
+        current_app.logger.exception("Failed to send digest email to %s: %s", email, exc)
+        # Let celery retry it
+        raise
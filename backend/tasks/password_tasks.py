@@ -0,0 +1,16 @@
+# backend/tasks/password_tasks.py
+from bson import ObjectId
+from flask import current_app
+from backend.celery_app import celery
+from backend.utils.migrations import wrap_weak_password_hashes
+
+
+@celery.task(bind=True, max_retries=5, autoretry_for=(Exception,), retry_backoff=True, retry_backoff_max=600,
+             ignore_result=True)
+def wrap_password_hashes_task(self, user_ids: list):
+    """
+    Wrap the migration-cost password hashes of freshly bulk-onboarded users at
+    full cost. Runs on the bulk queue; only hashes go through the broker.
+    """
+    wrapped = wrap_weak_password_hashes([ObjectId(user_id) for user_id in user_ids])
+    current_app.logger.info("Wrapped %s migration-cost password hash(es)", wrapped)
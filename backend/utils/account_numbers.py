@@ -0,0 +1,86 @@
+# backend/utils/account_numbers.py
+import os
+import threading
+from pymongo import ReturnDocument
+from backend.extensions import db
+
+ACCOUNT_NUMBER_PREFIX = "00103"
+# Numbers reserved per round trip and cached in this process. Unused numbers
+# in a block are skipped if the process exits, never handed out twice.
+ACCOUNT_NUMBER_BLOCK_SIZE = int(os.getenv("ACCOUNT_NUMBER_BLOCK_SIZE", 10))
+# With a check digit the suffix is 6 digits + 1 Luhn digit; without it the
+# suffix is 7 digits.
+ACCOUNT_NUMBER_CHECK_DIGIT = os.getenv("ACCOUNT_NUMBER_CHECK_DIGIT", "false").lower() == "true"
+
+# The old random generator drew suffixes from 1000000-9999999, so those
+# numbers may already be taken. Sequence numbers only use suffixes that start
+# with 0 (1M numbers, 100k with a check digit) and can never land on one.
+SEQUENCE_SPACE = 10**5 if ACCOUNT_NUMBER_CHECK_DIGIT else 10**6
+
+COUNTER_ID = "accountNumber"
+
+_lock = threading.Lock()
+_block = {"pid": None, "next": 0, "end": 0}
+
+
+def luhn_check_digit(digits: str) -> str:
+    total = 0
+    for i, ch in enumerate(reversed(digits)):
+        n = int(ch)
+        if i % 2 == 0:  # doubled positions, counting from the check digit's left
+            n *= 2
+            if n > 9:
+                n -= 9
+        total += n
+    return str((10 - total % 10) % 10)
+
+
+def is_valid_check_digit(account_number: str) -> bool:
+    return luhn_check_digit(account_number[:-1]) == account_number[-1]
+
+
+def format_account_number(seq: int) -> str:
+    """Turn the n-th allocated sequence value (1-based) into an account number."""
+    if not 1 <= seq <= SEQUENCE_SPACE:
+        raise RuntimeError("Account number space exhausted")
+    if ACCOUNT_NUMBER_CHECK_DIGIT:
+        body = ACCOUNT_NUMBER_PREFIX + f"{seq - 1:06d}"
+        return body + luhn_check_digit(body)
+    return ACCOUNT_NUMBER_PREFIX + f"{seq - 1:07d}"
+
+
+def reserve_block(size: int) -> range:
+    """
+    Atomically reserve `size` sequence values with one $inc on the counter
+    document. Concurrent callers always get disjoint ranges.
+    """
+    counter = db.counters.find_one_and_update(
+        {"_id": COUNTER_ID},
+        {"$inc": {"seq": size}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    end = counter["seq"]
+    return range(end - size + 1, end + 1)
+
+
+def next_account_number() -> str:
+    """
+    Next account number from this process's cached block, reserving a new
+    block when it runs out. Fork-safe: a child process never reuses the
+    parent's cached block.
+    """
+    with _lock:
+        if _block["pid"] != os.getpid() or _block["next"] >= _block["end"]:
+            block = reserve_block(ACCOUNT_NUMBER_BLOCK_SIZE)
+            _block.update(pid=os.getpid(), next=block.start, end=block.stop)
+        seq = _block["next"]
+        _block["next"] += 1
+    return format_account_number(seq)
+
+
+def allocate_account_numbers(count: int) -> list:
+    """Reserve `count` numbers in one round trip (bulk onboarding)."""
+    if count <= 0:
+        return []
+    return [format_account_number(seq) for seq in reserve_block(count)]
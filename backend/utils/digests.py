@@ -0,0 +1,136 @@
+# backend/utils/digests.py
+import json
+import logging
+import os
+import time
+from backend.extensions import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Notifications for opted-in users are held this long, then sent as one digest
+NOTIFY_DIGEST_WINDOW_SECONDS = int(os.getenv("NOTIFY_DIGEST_WINDOW_SECONDS", 900))
+# Transfers of at least this amount are always emailed immediately
+NOTIFY_DIGEST_BYPASS_AMOUNT = float(os.getenv("NOTIFY_DIGEST_BYPASS_AMOUNT", 1000))
+# Rows kept per digest (the most recent); older ones are only counted
+NOTIFY_DIGEST_MAX_ITEMS = int(os.getenv("NOTIFY_DIGEST_MAX_ITEMS", 200))
+NOTIFY_DIGEST_FLUSH_BATCH = int(os.getenv("NOTIFY_DIGEST_FLUSH_BATCH", 100))
+# A digest whose task could not be enqueued is retried after this long
+NOTIFY_DIGEST_RETRY_SECONDS = int(os.getenv("NOTIFY_DIGEST_RETRY_SECONDS", 60))
+
+# One hash tag for every digest key, so the claim script and the MULTI in
+# buffer_notification only ever touch keys in one Redis Cluster slot.
+PREFIX = "{notify:digest}:"
+DUE_KEY = PREFIX + "due"  # zset: recipient email -> time its window closes
+LEGACY_PREFIX = "notify:digest:"  # key names before the hash tag
+
+# Atomically take one recipient's buffer if its window is still closed, so
+# concurrent relays never send the same digest twice.
+# KEYS: due zset, items list, count; ARGV: email, now
+CLAIM_LUA = """
+local due_at = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not due_at or tonumber(due_at) > tonumber(ARGV[2]) then
+    return false
+end
+local count = redis.call('GET', KEYS[3]) or '0'
+local items = redis.call('LRANGE', KEYS[2], 0, -1)
+redis.call('DEL', KEYS[2], KEYS[3])
+redis.call('ZREM', KEYS[1], ARGV[1])
+return {count, items}
+"""
+_claim = redis_client.register_script(CLAIM_LUA)
+
+
+def _items_key(email: str) -> str:
+    return f"{PREFIX}items:{email}"
+
+
+def _count_key(email: str) -> str:
+    return f"{PREFIX}count:{email}"
+
+
+def wants_digest(account: dict, amount: float) -> bool:
+    """The account opted in to digests and the amount is below the bypass."""
+    return bool(account.get("emailDigest")) and float(amount) < NOTIFY_DIGEST_BYPASS_AMOUNT
+
+
+def buffer_notification(payload: dict, window: int = NOTIFY_DIGEST_WINDOW_SECONDS):
+    """
+    Add a transaction email payload to its recipient's digest. The first
+    notification opens the window; later ones join it. Raises RedisError.
+    """
+    email = payload["email"]
+    pipe = redis_client.pipeline()  # MULTI/EXEC
+    pipe.rpush(_items_key(email), json.dumps(payload))
+    pipe.ltrim(_items_key(email), -NOTIFY_DIGEST_MAX_ITEMS, -1)
+    pipe.incr(_count_key(email))
+    pipe.zadd(DUE_KEY, {email: time.time() + window}, nx=True)
+    pipe.execute()
+
+
+def _restore(email: str, total: int, items: list):
+    """Put a digest that could not be enqueued back in front of anything buffered since."""
+    pipe = redis_client.pipeline()
+    if items:
+        pipe.lpush(_items_key(email), *reversed(items))
+        pipe.ltrim(_items_key(email), -NOTIFY_DIGEST_MAX_ITEMS, -1)
+    pipe.incrby(_count_key(email), total)
+    pipe.zadd(DUE_KEY, {email: time.time() + NOTIFY_DIGEST_RETRY_SECONDS})
+    pipe.execute()
+
+
+def _claim_due(limit: int, now: float) -> list:
+    """(email, total, raw items) for up to `limit` recipients whose window has closed."""
+    emails = [e.decode() for e in redis_client.zrangebyscore(DUE_KEY, "-inf", now, start=0, num=limit)]
+    if not emails:
+        return []
+    pipe = redis_client.pipeline(transaction=False)
+    for email in emails:
+        _claim(keys=[DUE_KEY, _items_key(email), _count_key(email)], args=[email, now], client=pipe)
+    claimed = []
+    for email, result in zip(emails, pipe.execute()):
+        if result:  # None: claimed by another relay, or reopened, since the ZRANGEBYSCORE
+            claimed.append((email, int(result[0]), result[1]))
+    return claimed
+
+
+def flush_due_digests(send, limit: int = NOTIFY_DIGEST_FLUSH_BATCH, now: float = None) -> int:
+    """
+    Hand every closed window to `send(email, total, payloads)` (e.g. the
+    digest task's delay). If `send` raises, the digest is restored and
+    retried later. Returns the number of digests handed off.
+    """
+    sent = 0
+    for email, total, raw in _claim_due(limit, now if now is not None else time.time()):
+        try:
+            send(email, total, [json.loads(item) for item in raw])
+            sent += 1
+        except Exception as e:
+            logger.exception("❌ Digest for %s not enqueued, retrying later: %s", email, e)
+            _restore(email, total, raw)
+    return sent
+
+
+def migrate_legacy_keys() -> int:
+    """
+    One-off after deploying the hash-tagged key names: move digests buffered
+    under LEGACY_PREFIX (single-node Redis only) to the new keys, keeping
+    each recipient's window. Returns the number of recipients moved.
+    """
+    legacy_due = LEGACY_PREFIX + "due"
+    moved = 0
+    for email, due_at in redis_client.zrange(legacy_due, 0, -1, withscores=True):
+        email = email.decode()
+        items_key, count_key = f"{LEGACY_PREFIX}items:{email}", f"{LEGACY_PREFIX}count:{email}"
+        items = redis_client.lrange(items_key, 0, -1)
+        total = int(redis_client.get(count_key) or 0)
+        pipe = redis_client.pipeline()
+        if items:
+            pipe.lpush(_items_key(email), *reversed(items))
+            pipe.ltrim(_items_key(email), -NOTIFY_DIGEST_MAX_ITEMS, -1)
+        pipe.incrby(_count_key(email), total)
+        pipe.zadd(DUE_KEY, {email: due_at}, lt=True)  # the earlier of the two windows
+        pipe.delete(items_key, count_key)
+        pipe.zrem(legacy_due, email)
+        pipe.execute()
+        moved += 1
+    return moved
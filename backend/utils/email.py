@@ -1,47 +1,19 @@
 # utils/email.py
 import os
-import tempfile
-import subprocess
 from datetime import datetime
 from jinja2 import Template
 from flask_mail import Message
 from flask import current_app
 
-# import the 'mail' object you created in your package __init__.py
-# e.g. from yourapp import mail
-from backend import mail   # adjust import to match actual package name
+from backend.utils.mjml_renderer import render_mjml
+from backend.utils.smtp_pool import send_mail
 
 def mjml_to_html(rendered_mjml: str) -> str:
     """
-    Convert MJML string to HTML by calling the 'mjml' CLI.
-    Requires 'mjml' (npm package) installed and available in PATH.
+    Convert MJML string to HTML via the long-lived MJML renderer
+    (requires node and the 'mjml' npm package in backend/node_modules).
     """
-    # Write MJML to a temporary file
-    with tempfile.NamedTemporaryFile(suffix=".mjml", delete=False, mode="w", encoding="utf-8") as tmp:
-        tmp.write(rendered_mjml)
-        tmp_path = tmp.name
-
-    try:
-        # Call mjml CLI to output HTML to stdout
-        # --stdout (or -s) writes result to stdout; we capture it.
-        proc = subprocess.run(
-            ["mjml", tmp_path, "--stdout"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            check=False
-        )
-        if proc.returncode != 0:
-            # If conversion fails, log and raise or return None
-            err = proc.stderr.decode(errors="ignore")
-            current_app.logger.error(f"MJML conversion failed: {err}")
-            raise RuntimeError(f"MJML conversion failed: {err}")
-        html = proc.stdout.decode("utf-8")
-        return html
-    finally:
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+    return render_mjml(rendered_mjml)
 
 def send_transaction_email(
     recipient_email: str,
@@ -84,7 +56,7 @@ def send_transaction_email(
             recipients=[recipient_email],
             body=body
         )
-        mail.send(msg)
+        send_mail(msg)
         return
 
     # Send HTML email
@@ -93,4 +65,4 @@ def send_transaction_email(
         recipients=[recipient_email],
         html=html
     )
-    mail.send(msg)
+    send_mail(msg)
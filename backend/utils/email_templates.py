@@ -0,0 +1,107 @@
+# backend/utils/email_templates.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, TemplateNotFound
+from backend.utils.mjml_converter import TEMPLATES_DIR, mjml_to_html
+
+# Compiled templates kept per worker process
+EMAIL_TEMPLATE_CACHE_SIZE = int(os.getenv("EMAIL_TEMPLATE_CACHE_SIZE", 64))
+# How often a cached template's file is stat()ed for changes; 0 = every render
+EMAIL_TEMPLATE_CHECK_SECONDS = float(os.getenv("EMAIL_TEMPLATE_CHECK_SECONDS", 2))
+# Jinja bytecode shared by all workers on the host, so a fresh worker skips compiling.
+# Unset: Jinja's own per-user 0700 directory (ownership-checked). Bytecode is
+# loaded with marshal, so a configured directory must be private to this user.
+EMAIL_TEMPLATE_BYTECODE_DIR = os.getenv("EMAIL_TEMPLATE_BYTECODE_DIR")
+
+
+class TemplateRegistry:
+    """
+    Name -> compiled Jinja template, LRU-cached. "transaction" resolves to
+    compiled/transaction.html if it was precompiled, else transaction.mjml
+    (rendered, then converted to HTML). A cached entry is re-resolved when
+    its file's mtime changes, checked at most every `check_seconds`.
+    """
+
+    def __init__(self, search_path=TEMPLATES_DIR, cache_size=EMAIL_TEMPLATE_CACHE_SIZE,
+                 check_seconds=EMAIL_TEMPLATE_CHECK_SECONDS, bytecode_dir=EMAIL_TEMPLATE_BYTECODE_DIR):
+        if bytecode_dir:
+            os.makedirs(bytecode_dir, mode=0o700, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(bytecode_dir)
+        else:
+            bytecode_cache = FileSystemBytecodeCache()
+        self.env = Environment(
+            loader=FileSystemLoader(search_path),
+            bytecode_cache=bytecode_cache,
+            cache_size=0,  # caching and reloading are ours
+            auto_reload=False,
+        )
+        self.cache_size = cache_size
+        self.check_seconds = check_seconds
+        self._entries = OrderedDict()  # name -> (template, is_mjml, mtime, next_check)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "loads": 0, "reloads": 0}
+
+    def _load(self, name):
+        for filename, is_mjml in ((f"compiled/{name}.html", False), (f"{name}.mjml", True)):
+            try:
+                template = self.env.get_template(filename)
+            except TemplateNotFound:
+                continue
+            return template, is_mjml, os.path.getmtime(template.filename)
+        raise TemplateNotFound(name)
+
+    def _changed(self, name, template, mtime):
+        if os.path.exists(os.path.join(self.env.loader.searchpath[0], "compiled", f"{name}.html")) \
+                != template.name.startswith("compiled/"):
+            return True  # a precompiled version appeared or went away
+        try:
+            return os.path.getmtime(template.filename) != mtime
+        except OSError:
+            return True
+
+    def get(self, name):
+        """(template, is_mjml) for `name`. Raises TemplateNotFound."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry and entry[3] > now:
+                self._entries.move_to_end(name)
+                self.stats["hits"] += 1
+                return entry[0], entry[1]
+
+        if entry and not self._changed(name, entry[0], entry[2]):
+            template, is_mjml, mtime = entry[:3]
+            outcome = "hits"
+        else:
+            template, is_mjml, mtime = self._load(name)
+            outcome = "reloads" if entry else "loads"
+
+        with self._lock:
+            self.stats[outcome] += 1
+            self._entries[name] = (template, is_mjml, mtime, now + self.check_seconds)
+            self._entries.move_to_end(name)
+            while len(self._entries) > self.cache_size:
+                self._entries.popitem(last=False)
+        return template, is_mjml
+
+    def render(self, name, **context) -> str:
+        """Render `name` to email HTML."""
+        template, is_mjml = self.get(name)
+        output = template.render(**context)
+        return mjml_to_html(output) if is_mjml else output
+
+
+_registry = None
+
+
+def get_registry() -> TemplateRegistry:
+    global _registry
+    if _registry is None:
+        _registry = TemplateRegistry()
+    return _registry
+
+
+def render_email(name, **context) -> str:
+    return get_registry().render(name, **context)
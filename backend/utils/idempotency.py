@@ -0,0 +1,54 @@
+# backend/utils/idempotency.py
+import os
+from datetime import datetime
+from backend.extensions import db
+
+# How long a stored response can be replayed (default: 7 days).
+# Indexes for idempotency_keys are declared in utils/indexes.py
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 7 * 24 * 3600))
+IDEMPOTENCY_INDEX = "user_transaction_unique"
+
+
+def build_record(user_id, transaction_id, body: dict, status: int = 200) -> dict:
+    """Document stored alongside the transfer, holding the first response."""
+    return {
+        "user_id": user_id,
+        "transaction_id": transaction_id,
+        "response": body,
+        "status": status,
+        "created_at": datetime.utcnow(),
+    }
+
+
+def find_stored_response(user_id, transaction_id):
+    """
+    One indexed lookup for a previously completed request.
+    Returns (body, status) or None.
+    """
+    record = db.idempotency_keys.find_one(
+        {"user_id": user_id, "transaction_id": transaction_id},
+        {"_id": 0, "response": 1, "status": 1},
+    )
+    if not record:
+        return None
+    return record["response"], record.get("status", 200)
+
+
+def is_idempotency_conflict(error) -> bool:
+    """
+    True if a DuplicateKeyError (insert_one) or BulkWriteError (insert_many)
+    came from the idempotency_keys unique index, i.e. the transaction ID was
+    already used. Duplicate keys from other writes in the same transaction
+    (rollup or metrics upserts) are not replays.
+    """
+    details = error.details or {}
+    errors = details.get("writeErrors", [details])
+    for err in errors:
+        if err.get("code", 11000) != 11000:
+            continue
+        key_pattern = err.get("keyPattern") or {}
+        if set(key_pattern) == {"user_id", "transaction_id"}:
+            return True
+        if not key_pattern and IDEMPOTENCY_INDEX in str(err.get("errmsg", error)):
+            return True
+    return False
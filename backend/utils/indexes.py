@@ -0,0 +1,130 @@
+# backend/utils/indexes.py
+import logging
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+from backend.utils.idempotency import IDEMPOTENCY_INDEX, IDEMPOTENCY_TTL_SECONDS
+from backend.utils.outbox import OUTBOX_RETENTION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# ----------------- Index registry -----------------
+# collection -> list of (keys, options). Names are explicit so re-applying
+# is a no-op and `indexes check` output is readable.
+INDEXES = {
+    "users": [
+        ([("accountNumber", ASCENDING)], {"name": "accountNumber_unique", "unique": True}),
+        ([("email", ASCENDING)], {"name": "email_unique", "unique": True}),
+        # admin typeahead: anchored prefix regex over normalised names/email/account
+        ([("search_keys", ASCENDING)], {"name": "search_keys"}),
+    ],
+    "admins": [
+        ([("email", ASCENDING)], {"name": "email_unique", "unique": True}),
+    ],
+    "transactions": [
+        # history / summary / cursor pagination
+        ([("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+         {"name": "user_timestamp"}),
+        # admin transaction list (global, optionally by type)
+        ([("timestamp", DESCENDING), ("_id", DESCENDING)], {"name": "timestamp"}),
+        ([("type", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], {"name": "type_timestamp"}),
+        # type-filtered history and the spending chart
+        ([("user_id", ASCENDING), ("type", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+         {"name": "user_type_timestamp"}),
+    ],
+    "beneficiaries": [
+        ([("user_id", ASCENDING), ("accountNumber", ASCENDING), ("bank", ASCENDING)],
+         {"name": "user_account_bank_unique", "unique": True}),
+    ],
+    "spending_rollups": [
+        ([("user_id", ASCENDING), ("month", ASCENDING), ("narration", ASCENDING)],
+         {"name": "user_month_narration_unique", "unique": True}),
+    ],
+    "outbox": [
+        # relay: due pending messages and expired leases, oldest first
+        ([("status", ASCENDING), ("available_at", ASCENDING)], {"name": "status_available_at"}),
+        ([("status", ASCENDING), ("lease_until", ASCENDING)], {"name": "status_lease_until"}),
+        # only sent messages have sent_at, so only they expire
+        ([("sent_at", ASCENDING)],
+         {"name": "sent_at_ttl", "expireAfterSeconds": OUTBOX_RETENTION_SECONDS}),
+    ],
+    "metrics": [
+        # admin dashboard: sum the shards of each counter, daily window by key
+        ([("kind", ASCENDING), ("key", ASCENDING)], {"name": "kind_key"}),
+    ],
+    "idempotency_keys": [
+        ([("user_id", ASCENDING), ("transaction_id", ASCENDING)],
+         {"name": IDEMPOTENCY_INDEX, "unique": True}),
+        ([("created_at", ASCENDING)],
+         {"name": "created_at_ttl", "expireAfterSeconds": IDEMPOTENCY_TTL_SECONDS}),
+    ],
+}
+
+# ----------------- Hot queries -----------------
+# (name, collection, filter, sort) for the lookups on our request paths.
+# `check_hot_queries` fails if any of them is planned as a COLLSCAN.
+HOT_QUERIES = [
+    ("transfer: sender by accountNumber", "users", {"accountNumber": "001030000000"}, None),
+    ("admin search: prefix", "users", {"search_keys": {"$regex": "^probe"}}, None),
+    ("auth.login: admin by email", "admins", {"email": "probe@example.com"}, None),
+    ("auth.login: user by email", "users", {"email": "probe@example.com"}, None),
+    ("block_check_required: user by _id", "users", {"_id": ObjectId("000000000000000000000000")}, None),
+    ("transactions: history page", "transactions", {"user_id": "probe"},
+     [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ("transactions: history by type", "transactions", {"user_id": "probe", "type": "debit"},
+     [("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ("beneficiaries: save beneficiary", "beneficiaries",
+     {"user_id": "probe", "accountNumber": "001030000000", "bank": "probe"}, None),
+    ("spending chart: monthly rollups", "spending_rollups", {"user_id": "probe", "month": "2025-01"}, None),
+    ("outbox relay: due messages", "outbox", {"status": "pending", "available_at": {"$lte": datetime(2000, 1, 1)}},
+     [("available_at", ASCENDING)]),
+    ("admin metrics: daily window", "metrics", {"kind": "daily", "key": {"$gte": "2025-01-01"}}, None),
+    ("transfer: idempotency lookup", "idempotency_keys", {"user_id": "probe", "transaction_id": "probe"}, None),
+]
+
+
+def ensure_indexes(db):
+    """
+    Create every registered index. Safe to run repeatedly: existing indexes
+    with the same spec are left alone. Failures (e.g. duplicate data blocking
+    a unique index) are logged and returned instead of stopping startup.
+    """
+    failures = []
+    for collection, specs in INDEXES.items():
+        for keys, options in specs:
+            try:
+                db[collection].create_index(keys, **options)
+            except OperationFailure as e:
+                logger.error("❌ Could not create index %s.%s: %s", collection, options.get("name"), e)
+                failures.append((collection, options.get("name"), str(e)))
+    return failures
+
+
+def _plan_stages(plan):
+    """Yield every 'stage' name in an explain() plan tree."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+def check_hot_queries(db):
+    """
+    explain() every registered hot query and return the ones whose winning
+    plan contains a COLLSCAN, as a list of (name, stages).
+    """
+    failures = []
+    for name, collection, query, sort in HOT_QUERIES:
+        cursor = db[collection].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        explained = cursor.explain()
+        stages = list(_plan_stages(explained.get("queryPlanner", {}).get("winningPlan", {})))
+        if "COLLSCAN" in stages:
+            failures.append((name, stages))
+    return failures
@@ -1,6 +1,7 @@
 # backend/utils/init_db.py
 
 from datetime import datetime
+from backend.utils.passwords import hash_password
 
 def initialize_database(mongo):
     admin_collection = mongo.db.admins
@@ -9,7 +10,7 @@ def initialize_database(mongo):
     if not existing_admin:
         admin = {
             "username": "admin",
-            "password": "admin123",  # hash this if bcrypt is enabled
+            "password": hash_password("admin123"),
             "email": "admin@bank.com",
             "role": "admin",
             "permissions": {
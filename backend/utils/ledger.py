@@ -0,0 +1,169 @@
+# backend/utils/ledger.py
+import math
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from backend.extensions import db, mongo_client
+from backend.utils.idempotency import is_idempotency_conflict
+from backend.utils.rollups import spending_rollup_op
+from backend.utils.outbox import stage_messages
+from backend.utils.metrics import apply_deltas, merge_deltas, balance_deltas, transaction_deltas
+
+
+# Re-runs of a transaction that lost an upsert race on a rollup or metrics doc
+UPSERT_RACE_RETRIES = 2
+
+
+class InsufficientFunds(Exception):
+    """Raised when the guarded debit finds the balance below the amount."""
+
+
+def parse_money(value, field: str = "balance") -> float:
+    """
+    A balance or amount as a float, from a number or a numeric string (the
+    admin forms send the raw input). The guarded $gte and $inc below, and
+    cursors sorted on these fields, only work if they are always numbers,
+    so anything else raises ValueError.
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"{field} must be a number")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number")
+    if not math.isfinite(number):
+        raise ValueError(f"{field} must be a number")
+    return number
+
+
+def debit(account_number: str, amount: float, session=None):
+    """
+    Take `amount` off an account in a single conditional $inc.
+    The filter only matches while balance >= amount, so two concurrent
+    debits can never both spend the same money.
+    """
+    account = db.users.find_one_and_update(
+        {"accountNumber": account_number, "balance": {"$gte": amount}},
+        {"$inc": {"balance": -amount}},
+        return_document=ReturnDocument.AFTER,
+        session=session,
+    )
+    if account is None:
+        raise InsufficientFunds(account_number)
+    return account
+
+
+def credit(account_number: str, amount: float, session=None):
+    """
+    Add `amount` to an account with $inc.
+    Returns the updated account, or None if the account is not one of ours.
+    """
+    return db.users.find_one_and_update(
+        {"accountNumber": account_number},
+        {"$inc": {"balance": amount}},
+        return_document=ReturnDocument.AFTER,
+        session=session,
+    )
+
+
+def run_transaction(apply):
+    """
+    Run `apply(session)` in a multi-document transaction. Two transfers
+    creating the same spending rollup or metrics doc can race on its unique
+    index; the loser is re-run (the doc exists by then). A duplicate on the
+    idempotency index is a replay and is raised straight away.
+    """
+    for attempt in range(UPSERT_RACE_RETRIES + 1):
+        try:
+            with mongo_client.start_session() as session:
+                return session.with_transaction(apply)
+        except (DuplicateKeyError, BulkWriteError) as e:
+            if is_idempotency_conflict(e) or attempt == UPSERT_RACE_RETRIES:
+                raise
+
+
+def post_transfer(from_account, to_account, amount, debit_entry, credit_entry, expense,
+                  idempotency_record=None, notifications=None):
+    """
+    Apply both legs of a transfer and write its records in one multi-document
+    transaction. `credit_entry` gets the recipient's user_id filled in and is
+    only written when the beneficiary is an internal account.
+
+    The debit's (user_id, month, narration) spending rollup and the admin
+    dashboard counters are bumped in the same transaction. `idempotency_record` is inserted first; a replayed transaction ID hits the
+    unique index, raises DuplicateKeyError and nothing else is written.
+
+    Returns (sender, recipient) as they look after the transfer; recipient is
+    None for external transfers. Raises InsufficientFunds and rolls back if
+    the sender can't cover the amount.
+    """
+    def _apply(session):
+        if idempotency_record is not None:
+            db.idempotency_keys.insert_one(idempotency_record, session=session)
+
+        sender = debit(from_account, amount, session=session)
+        db.transactions.insert_one(debit_entry, session=session)
+        db.expenses.insert_one(expense, session=session)
+        db.spending_rollups.bulk_write([spending_rollup_op(debit_entry)], session=session)
+
+        recipient = credit(to_account, amount, session=session)
+        deltas = [balance_deltas(sender.get("accountType"), -amount), transaction_deltas(debit_entry)]
+        if recipient:
+            credit_entry["user_id"] = str(recipient["_id"])
+            db.transactions.insert_one(credit_entry, session=session)
+            deltas += [balance_deltas(recipient.get("accountType"), amount), transaction_deltas(credit_entry)]
+        apply_deltas(merge_deltas(*deltas), session=session)
+
+        if notifications:
+            stage_messages(notifications(sender, recipient), session=session)
+        return sender, recipient
+
+    return run_transaction(_apply)
+
+
+def post_batch(from_account, total, credits, transactions, expenses, idempotency_records=(),
+               notifications=None):
+    """
+    Apply a whole batch of transfers from one account in one transaction:
+    a single guarded debit for `total`, one bulk_write of $inc credits
+    (`credits` maps internal account number -> amount) and insert_many for
+    the records. Returns the sender as it looks after the debit.
+
+    `notifications(sender, recipients)` gets the post-batch recipients keyed
+    by account number and returns payloads to stage in the outbox.
+    """
+    def _apply(session):
+        if idempotency_records:
+            db.idempotency_keys.insert_many(list(idempotency_records), session=session)
+
+        sender = debit(from_account, total, session=session)
+        if credits:
+            db.users.bulk_write(
+                [
+                    UpdateOne({"accountNumber": acct}, {"$inc": {"balance": amount}})
+                    for acct, amount in credits.items()
+                ],
+                ordered=False,
+                session=session,
+            )
+        if transactions:
+            db.transactions.insert_many(transactions, session=session)
+            rollup_ops = [spending_rollup_op(t) for t in transactions if t.get("type") == "debit"]
+            if rollup_ops:
+                db.spending_rollups.bulk_write(rollup_ops, ordered=False, session=session)
+        if expenses:
+            db.expenses.insert_many(expenses, session=session)
+
+        recipients = {
+            r["accountNumber"]: r
+            for r in db.users.find({"accountNumber": {"$in": list(credits)}}, session=session)
+        } if credits else {}
+        deltas = [balance_deltas(sender.get("accountType"), -total)]
+        deltas += [balance_deltas(r.get("accountType"), credits[acct]) for acct, r in recipients.items()]
+        deltas += [transaction_deltas(t) for t in transactions]
+        apply_deltas(merge_deltas(*deltas), session=session)
+
+        if notifications:
+            stage_messages(notifications(sender, recipients), session=session)
+        return sender
+
+    return run_transaction(_apply)
@@ -0,0 +1,229 @@
+# backend/utils/metrics.py
+import os
+import random
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from backend.extensions import db
+from backend.utils.rollups import SAFE_AMOUNT
+
+# Every counter is split over this many documents. Writers $inc a random
+# shard so concurrent transfers don't write-conflict on one hot document
+# inside their transactions; readers sum the shards.
+METRICS_SHARDS = int(os.getenv("METRICS_SHARDS", 8))
+METRICS_RECONCILE_INTERVAL = float(os.getenv("METRICS_RECONCILE_INTERVAL", 3600))
+
+TRANSACTION_FIELDS = ("debit_total", "debit_count", "credit_total", "credit_count")
+SAFE_BALANCE = {"$convert": {"input": "$balance", "to": "double", "onError": 0.0, "onNull": 0.0}}
+ACCOUNT_TYPE_KEY = {"$cond": [{"$gt": [{"$ifNull": ["$accountType", ""]}, ""]}, "$accountType", "Unknown"]}
+
+# Metric documents look like
+#   {_id: "daily:2025-09-22:3", kind: "daily", key: "2025-09-22", shard: 3, debit_total: ..., ...}
+# kinds: users/all (total, blocked), account_type/<type> (users, balance),
+#        transactions/all and daily/<YYYY-MM-DD> (debit_/credit_ total and count)
+
+
+def _number(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def day_key(ts):
+    # Transaction timestamps are naive local time (datetime.now() in the
+    # transfer routes); buckets and the dashboard window both use that clock.
+    return ts.strftime("%Y-%m-%d") if isinstance(ts, datetime) else None
+
+
+def _add(deltas: dict, kind: str, key: str, **fields):
+    bucket = deltas.setdefault((kind, key), {})
+    for field, value in fields.items():
+        bucket[field] = bucket.get(field, 0) + value
+    return deltas
+
+
+def merge_deltas(*parts) -> dict:
+    merged = {}
+    for part in parts:
+        for (kind, key), fields in part.items():
+            _add(merged, kind, key, **fields)
+    return merged
+
+
+def user_deltas(before, after) -> dict:
+    """
+    Counter changes for a user going from `before` to `after`
+    (None before = created, None after = deleted).
+    """
+    deltas = {}
+    for user, sign in ((before, -1), (after, 1)):
+        if user is None:
+            continue
+        _add(deltas, "users", "all", total=sign, blocked=sign if user.get("blocked") is True else 0)
+        _add(deltas, "account_type", user.get("accountType") or "Unknown",
+             users=sign, balance=sign * _number(user.get("balance")))
+    return deltas
+
+
+def blocked_deltas(change: int) -> dict:
+    """`change` users were blocked (negative: unblocked) in one bulk update."""
+    return _add({}, "users", "all", blocked=change)
+
+
+def balance_deltas(account_type, amount: float) -> dict:
+    """A balance moved by `amount` on an account of `account_type`."""
+    return _add({}, "account_type", account_type or "Unknown", balance=amount)
+
+
+def transaction_deltas(tx: dict, sign: int = 1) -> dict:
+    """Volume counters for a debit/credit record (sign=-1 to take one back out)."""
+    kind = tx.get("type")
+    if kind not in ("debit", "credit"):
+        return {}
+    fields = {f"{kind}_total": sign * _number(tx.get("amount")), f"{kind}_count": sign}
+    deltas = _add({}, "transactions", "all", **fields)
+    day = day_key(tx.get("timestamp"))
+    if day:
+        _add(deltas, "daily", day, **fields)
+    return deltas
+
+
+def metric_ops(deltas: dict, shard=None) -> list:
+    ops = []
+    for (kind, key), fields in deltas.items():
+        fields = {f: v for f, v in fields.items() if v}
+        if not fields:
+            continue
+        n = random.randrange(METRICS_SHARDS) if shard is None else shard
+        ops.append(UpdateOne(
+            {"_id": f"{kind}:{key}:{n}"},
+            {"$inc": fields, "$setOnInsert": {"kind": kind, "key": key, "shard": n}},
+            upsert=True,
+        ))
+    return ops
+
+
+def apply_deltas(deltas: dict, session=None, shard=None):
+    """Apply counter changes in one bulk_write (inside `session` if given)."""
+    ops = metric_ops(deltas, shard)
+    if ops:
+        db.metrics.bulk_write(ops, ordered=False, session=session)
+
+
+# ----------------- Reading -----------------
+def _stored_metrics(match: dict) -> dict:
+    """Sum the shards of every (kind, key) matched."""
+    fields = ("total", "blocked", "users", "balance") + TRANSACTION_FIELDS
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": {"kind": "$kind", "key": "$key"}, **{f: {"$sum": f"${f}"} for f in fields}}},
+    ]
+    return {
+        (row["_id"]["kind"], row["_id"]["key"]): {f: row[f] for f in fields}
+        for row in db.metrics.aggregate(pipeline)
+    }
+
+
+def _volume(fields: dict) -> dict:
+    return {
+        "debitTotal": round(fields.get("debit_total", 0), 2),
+        "debitCount": fields.get("debit_count", 0),
+        "creditTotal": round(fields.get("credit_total", 0), 2),
+        "creditCount": fields.get("credit_count", 0),
+    }
+
+
+def read_metrics(days: int = 30) -> dict:
+    """Dashboard numbers from the metric documents; one aggregate, no raw scans."""
+    since = day_key(datetime.now() - timedelta(days=days - 1))
+    stored = _stored_metrics({"$or": [
+        {"kind": {"$in": ["users", "account_type", "transactions"]}},
+        {"kind": "daily", "key": {"$gte": since}},
+    ]})
+
+    users = stored.get(("users", "all"), {})
+    by_type = sorted(
+        ({"accountType": key, "users": f["users"], "balance": round(f["balance"], 2)}
+         for (kind, key), f in stored.items() if kind == "account_type" and f["users"]),
+        key=lambda row: row["accountType"],
+    )
+    daily = sorted(
+        ({"date": key, **_volume(f)} for (kind, key), f in stored.items() if kind == "daily"),
+        key=lambda row: row["date"],
+    )
+    return {
+        "users": {
+            "total": users.get("total", 0),
+            "blocked": users.get("blocked", 0),
+            "active": users.get("total", 0) - users.get("blocked", 0),
+        },
+        "totalDeposits": round(sum(row["balance"] for row in by_type), 2),
+        "balancesByAccountType": by_type,
+        "transactions": _volume(stored.get(("transactions", "all"), {})),
+        "daily": daily,
+    }
+
+
+# ----------------- Reconciliation -----------------
+def _raw_metrics() -> dict:
+    """The same counters computed from users and transactions directly."""
+    raw = {}
+    for row in db.users.aggregate([
+        {"$group": {
+            "_id": ACCOUNT_TYPE_KEY,
+            "users": {"$sum": 1},
+            "blocked": {"$sum": {"$cond": [{"$eq": ["$blocked", True]}, 1, 0]}},
+            "balance": {"$sum": SAFE_BALANCE},
+        }},
+    ], allowDiskUse=True):
+        _add(raw, "users", "all", total=row["users"], blocked=row["blocked"])
+        _add(raw, "account_type", row["_id"], users=row["users"], balance=row["balance"])
+
+    for row in db.transactions.aggregate([
+        {"$match": {"type": {"$in": ["debit", "credit"]}}},
+        {"$group": {
+            "_id": {
+                "type": "$type",
+                "day": {"$cond": [
+                    {"$eq": [{"$type": "$timestamp"}, "date"]},
+                    {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+                    None,
+                ]},
+            },
+            "total": {"$sum": SAFE_AMOUNT},
+            "count": {"$sum": 1},
+        }},
+    ], allowDiskUse=True):
+        kind = row["_id"]["type"]
+        fields = {f"{kind}_total": row["total"], f"{kind}_count": row["count"]}
+        _add(raw, "transactions", "all", **fields)
+        if row["_id"]["day"]:
+            _add(raw, "daily", row["_id"]["day"], **fields)
+    return raw
+
+
+def reconcile_metrics(repair: bool = True, tolerance: float = 0.005) -> list:
+    """
+    Compare the counters with the raw collections and, if `repair`, $inc
+    the difference onto shard 0. Corrections are relative, so increments
+    landing meanwhile are never overwritten; anything that slips between
+    the two reads is picked up by the next run. Returns the mismatches.
+    """
+    expected = _raw_metrics()
+    actual = _stored_metrics({})
+
+    mismatches = []
+    corrections = {}
+    for ident in expected.keys() | actual.keys():
+        want, have = expected.get(ident, {}), actual.get(ident, {})
+        for field in want.keys() | {f for f, v in have.items() if v}:
+            diff = want.get(field, 0) - have.get(field, 0)
+            if abs(diff) > tolerance:
+                _add(corrections, ident[0], ident[1], **{field: diff})
+                mismatches.append({
+                    "kind": ident[0], "key": ident[1], "field": field,
+                    "expected": want.get(field, 0), "actual": have.get(field, 0),
+                })
+    if repair:
+        apply_deltas(corrections, shard=0)
+    return mismatches
@@ -0,0 +1,85 @@
+# backend/utils/migrations.py
+from pymongo import UpdateOne
+from backend.extensions import db
+from backend.utils.ledger import parse_money
+from backend.utils.passwords import weak_hash_pattern, wrap_hashes
+
+WRAP_HASHES_BATCH = 200
+
+
+def _normalize_money(collection, field: str, label: str, dry_run: bool):
+    ops = []
+    unconvertible = []
+    for doc in collection.find({field: {"$type": "string"}}, {label: 1, field: 1}):
+        try:
+            number = parse_money(doc[field], field)
+        except ValueError:
+            unconvertible.append({label: doc.get(label, doc["_id"]), field: doc[field]})
+            continue
+        # guarded on the old value, so a concurrent edit wins
+        ops.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: number}}))
+
+    if dry_run or not ops:
+        return len(ops), unconvertible
+    return collection.bulk_write(ops, ordered=False).modified_count, unconvertible
+
+
+def normalize_balances(dry_run: bool = False):
+    """
+    One-off: convert users.balance values stored as strings (written by the
+    admin edit forms before balances were coerced) to numbers, so the
+    ledger's guarded $gte/$inc and balance-sorted cursors see one type.
+    The dashboard counters already read numeric strings as numbers.
+
+    Returns (converted, unconvertible): the number of balances converted
+    (or convertible, with dry_run) and the accounts whose balance isn't a
+    number, left untouched for a human to fix.
+    """
+    return _normalize_money(db.users, "balance", "accountNumber", dry_run)
+
+
+def normalize_amounts(dry_run: bool = False):
+    """
+    Same for transactions.amount (admin transaction edits stored the raw
+    input), so amount-sorted admin cursors don't skip string-typed rows.
+    """
+    return _normalize_money(db.transactions, "amount", "_id", dry_run)
+
+
+def wrap_weak_password_hashes(user_ids=None, dry_run: bool = False) -> int:
+    """
+    Bring users' bcrypt hashes below PASSWORD_HASH_ROUNDS (bulk-onboarded
+    accounts hashed at PASSWORD_MIGRATION_ROUNDS) up to full cost without
+    their passwords, by wrapping them (see utils/passwords.py). Only
+    `user_ids` if given. Returns the number wrapped (or wrappable, with
+    dry_run); each update is guarded on the old hash, so a login that
+    rehashed it meanwhile wins.
+    """
+    pattern = weak_hash_pattern()
+    if pattern is None:
+        return 0
+    query = {"password": {"$regex": pattern}}
+    if user_ids is not None:
+        query["_id"] = {"$in": list(user_ids)}
+    if dry_run:
+        return db.users.count_documents(query)
+
+    wrapped = 0
+    batch = []
+    for doc in db.users.find(query, {"password": 1}).batch_size(WRAP_HASHES_BATCH):
+        batch.append(doc)
+        if len(batch) >= WRAP_HASHES_BATCH:
+            wrapped += _wrap_batch(batch)
+            batch = []
+    if batch:
+        wrapped += _wrap_batch(batch)
+    return wrapped
+
+
+def _wrap_batch(docs) -> int:
+    hashes = wrap_hashes([doc["password"] for doc in docs])
+    ops = [
+        UpdateOne({"_id": doc["_id"], "password": doc["password"]}, {"$set": {"password": h}})
+        for doc, h in zip(docs, hashes)
+    ]
+    return db.users.bulk_write(ops, ordered=False).modified_count
@@ -3,13 +3,22 @@ import os
 import tempfile
 import subprocess
 from flask import current_app
+from backend.utils.mjml_renderer import render_mjml
 
 TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "..", "templates", "email")
 PRECOMPILED_DIR = os.path.join(os.path.dirname(__file__), "..", "templates", "email", "compiled")
 
+def mjml_to_html(mjml_str: str) -> str:
+    """
+    Convert an MJML string to HTML with this process's long-lived renderer
+    (see utils/mjml_renderer.py). Raises RuntimeError on failure.
+    """
+    return render_mjml(mjml_str)
+
 def mjml_to_html_via_cli(mjml_str: str) -> str:
     """
-    Convert MJML string to HTML by calling mjml CLI. Raises RuntimeError on failure.
+    Convert MJML string to HTML by starting the mjml CLI (one Node process
+    per call). Kept for comparison; use mjml_to_html().
     """
     with tempfile.NamedTemporaryFile(suffix=".mjml", delete=False, mode="w", encoding="utf-8") as tmp:
         tmp.write(mjml_str)
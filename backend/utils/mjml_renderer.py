@@ -0,0 +1,163 @@
+# backend/utils/mjml_renderer.py
+import atexit
+import json
+import logging
+import os
+import select
+import struct
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MJML_NODE_BINARY = os.getenv("MJML_NODE_BINARY", "node")
+MJML_WORKER_SCRIPT = os.path.join(os.path.dirname(__file__), "..", "scripts", "mjml_worker.js")
+MJML_RENDER_TIMEOUT = float(os.getenv("MJML_RENDER_TIMEOUT", 10))
+# Recycle the Node process after this many renders to cap any slow leak
+MJML_WORKER_MAX_RENDERS = int(os.getenv("MJML_WORKER_MAX_RENDERS", 5000))
+
+HEADER = struct.Struct(">I")
+
+
+class MjmlRenderError(RuntimeError):
+    """MJML could not be converted (bad markup, or the renderer is unavailable)."""
+
+
+class MjmlRenderTimeout(MjmlRenderError):
+    """The renderer didn't answer in time; it has been killed and will restart."""
+
+
+class MjmlRenderer:
+    """
+    One long-lived `node mjml_worker.js` per process, spoken to over its
+    stdin/stdout with length-prefixed JSON frames. Started lazily, restarted
+    after a crash, a timeout, a fork or MJML_WORKER_MAX_RENDERS renders.
+    One render is in flight at a time.
+    """
+
+    def __init__(self, node=MJML_NODE_BINARY, script=MJML_WORKER_SCRIPT,
+                 timeout=MJML_RENDER_TIMEOUT, max_renders=MJML_WORKER_MAX_RENDERS):
+        self.command = [node, os.path.abspath(script)]
+        self.timeout = timeout
+        self.max_renders = max_renders
+        self._proc = None
+        self._pid = None
+        self._renders = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.stats = {"renders": 0, "starts": 0, "crashes": 0, "timeouts": 0}
+
+    # ----------------- process management -----------------
+    def _alive(self) -> bool:
+        return self._proc is not None and self._pid == os.getpid() and self._proc.poll() is None
+
+    def _start(self):
+        self._proc = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            bufsize=0,
+            cwd=os.path.dirname(self.command[1]),
+        )
+        self._pid = os.getpid()
+        self._renders = 0
+        self.stats["starts"] += 1
+        logger.info("🟢 MJML renderer started (pid %s)", self._proc.pid)
+
+    def _stop(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        if self._pid != os.getpid():
+            # forked child: drop our copies of the parent's pipes, leave its renderer alone
+            proc.stdin.close()
+            proc.stdout.close()
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=1)
+        except Exception:
+            proc.kill()
+            proc.wait()
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+    # ----------------- framing -----------------
+    def _read_exact(self, size: int, deadline: float) -> bytes:
+        fd = self._proc.stdout.fileno()
+        chunks = []
+        while size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise MjmlRenderTimeout(f"MJML render took longer than {self.timeout}s")
+            chunk = os.read(fd, size)
+            if not chunk:
+                raise BrokenPipeError("MJML renderer exited")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def _roundtrip(self, request: dict) -> dict:
+        body = json.dumps(request).encode("utf-8")
+        frame = memoryview(HEADER.pack(len(body)) + body)
+        while frame:
+            frame = frame[self._proc.stdin.write(frame):]
+        deadline = time.monotonic() + self.timeout
+        (size,) = HEADER.unpack(self._read_exact(HEADER.size, deadline))
+        return json.loads(self._read_exact(size, deadline))
+
+    # ----------------- API -----------------
+    def render(self, mjml: str, options: dict = None) -> str:
+        """MJML -> HTML. Raises MjmlRenderError / MjmlRenderTimeout."""
+        with self._lock:
+            for attempt in (1, 2):
+                if not self._alive() or self._renders >= self.max_renders:
+                    self._stop()
+                    try:
+                        self._start()
+                    except OSError as e:
+                        raise MjmlRenderError(f"Cannot start MJML renderer: {e}")
+                self._next_id += 1
+                request_id = self._next_id
+                try:
+                    reply = self._roundtrip({"id": request_id, "mjml": mjml, "options": options or {}})
+                except MjmlRenderTimeout:
+                    self.stats["timeouts"] += 1
+                    self._proc.kill()
+                    self._stop()
+                    raise
+                except (BrokenPipeError, OSError, ValueError) as e:
+                    # crashed mid-render: restart and retry once
+                    self.stats["crashes"] += 1
+                    logger.warning("⚠️ MJML renderer crashed (%s), restarting", e)
+                    self._stop()
+                    if attempt == 2:
+                        raise MjmlRenderError(f"MJML renderer crashed: {e}")
+                    continue
+                self._renders += 1
+                self.stats["renders"] += 1
+                break
+
+        if reply.get("id") != request_id or "error" in reply:
+            raise MjmlRenderError(f"MJML conversion failed: {reply.get('error', 'mismatched reply')}")
+        for error in reply.get("errors") or []:
+            logger.warning("MJML validation: %s", error)
+        return reply["html"]
+
+
+_renderer = None
+
+
+def get_renderer() -> MjmlRenderer:
+    global _renderer
+    if _renderer is None:
+        _renderer = MjmlRenderer()
+        atexit.register(_renderer.close)
+    return _renderer
+
+
+def render_mjml(mjml: str) -> str:
+    return get_renderer().render(mjml)
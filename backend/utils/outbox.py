@@ -0,0 +1,171 @@
+# backend/utils/outbox.py
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from redis.exceptions import RedisError
+from backend.extensions import db
+from backend.utils.digests import buffer_notification, flush_due_digests
+
+logger = logging.getLogger(__name__)
+
+TASK_SEND_TRANSACTION_EMAIL = "send_transaction_email"
+TASK_SEND_DIGEST_EMAIL = "send_digest_email"
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 100))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", 60))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 10))
+# Sent messages are kept this long for auditing, then expire (see utils/indexes.py)
+OUTBOX_RETENTION_SECONDS = int(os.getenv("OUTBOX_RETENTION_SECONDS", 3 * 24 * 3600))
+
+
+def _tasks():
+    """Outbox task name -> Celery task. Imported lazily: only the relay needs Celery."""
+    from backend.tasks.email_tasks import send_digest_email_task, send_transaction_email_task
+    return {
+        TASK_SEND_TRANSACTION_EMAIL: send_transaction_email_task,
+        TASK_SEND_DIGEST_EMAIL: send_digest_email_task,
+    }
+
+
+def outbox_message(payload: dict, task: str = TASK_SEND_TRANSACTION_EMAIL) -> dict:
+    now = datetime.utcnow()
+    return {
+        "task": task,
+        "payload": payload,
+        "status": "pending",
+        "attempts": 0,
+        "created_at": now,
+        "available_at": now,
+    }
+
+
+def stage_messages(payloads, session=None, task: str = TASK_SEND_TRANSACTION_EMAIL):
+    """
+    Write notifications to the outbox. Pass the transfer's session so they
+    commit (or roll back) with it; the request never talks to the broker.
+    """
+    messages = [outbox_message(p, task) for p in payloads if p]
+    if messages:
+        db.outbox.insert_many(messages, session=session)
+    return len(messages)
+
+
+def coalesce(message: dict) -> bool:
+    """
+    Buffer a transaction email for the recipient's digest instead of sending
+    it (the payload says so, see wants_digest). False means send it now,
+    including when Redis is unavailable.
+    """
+    payload = message.get("payload") or {}
+    if message.get("task") != TASK_SEND_TRANSACTION_EMAIL or not payload.get("digest") or not payload.get("email"):
+        return False
+    try:
+        buffer_notification(payload)
+        return True
+    except RedisError as e:
+        logger.warning("⚠️ Digest buffer unavailable (%s), sending %s immediately", e, message["_id"])
+        return False
+
+
+def flush_digests() -> int:
+    """Enqueue one digest email per recipient whose window has closed."""
+    send_digest = _tasks()[TASK_SEND_DIGEST_EMAIL]
+    try:
+        return flush_due_digests(lambda email, total, payloads: send_digest.apply_async(args=[email, total, payloads]))
+    except RedisError as e:
+        logger.warning("⚠️ Digest flush skipped, Redis unavailable: %s", e)
+        return 0
+
+
+def claim_batch(worker_id: str, batch_size: int = OUTBOX_BATCH_SIZE, lease_seconds: int = OUTBOX_LEASE_SECONDS):
+    """
+    Lease up to `batch_size` due messages to this relay. Messages whose lease
+    ran out (relay crashed mid-batch) are claimable again.
+    """
+    now = datetime.utcnow()
+    due = {"$or": [
+        {"status": "pending", "available_at": {"$lte": now}},
+        {"status": "claimed", "lease_until": {"$lt": now}},
+    ]}
+    ids = [m["_id"] for m in db.outbox.find(due, {"_id": 1}).sort("available_at", 1).limit(batch_size)]
+    if not ids:
+        return []
+
+    db.outbox.update_many(
+        {"_id": {"$in": ids}, **due},
+        {"$set": {
+            "status": "claimed",
+            "claimed_by": worker_id,
+            "lease_until": now + timedelta(seconds=lease_seconds),
+        }},
+    )
+    return list(db.outbox.find({"_id": {"$in": ids}, "claimed_by": worker_id, "status": "claimed"}))
+
+
+def relay_batch(worker_id: str, batch_size: int = OUTBOX_BATCH_SIZE):
+    """
+    Hand one batch of outbox messages to Celery, or to the digest buffer for
+    opted-in recipients. A message is marked sent only after the broker (or
+    Redis) accepted it, so delivery is at-least-once. Returns (sent, failed).
+    """
+    messages = claim_batch(worker_id, batch_size)
+    if not messages:
+        return 0, 0
+
+    tasks = _tasks()
+    now = datetime.utcnow()
+    sent_ids = []
+    retry_ops = []
+    for message in messages:
+        task = tasks.get(message.get("task"))
+        try:
+            if task is None:
+                raise LookupError(f"Unknown outbox task: {message.get('task')}")
+            if not coalesce(message):
+                task.apply_async(args=[message["payload"]])
+            sent_ids.append(message["_id"])
+        except Exception as e:
+            attempts = message.get("attempts", 0) + 1
+            logger.exception("❌ Outbox relay failed for %s: %s", message["_id"], e)
+            retry_ops.append(UpdateOne(
+                {"_id": message["_id"], "claimed_by": worker_id},
+                {"$set": {
+                    "status": "dead" if attempts >= OUTBOX_MAX_ATTEMPTS else "pending",
+                    "attempts": attempts,
+                    "last_error": str(e),
+                    # exponential backoff, capped at 10 minutes
+                    "available_at": now + timedelta(seconds=min(2 ** attempts, 600)),
+                }, "$unset": {"claimed_by": "", "lease_until": ""}},
+            ))
+
+    if sent_ids:
+        db.outbox.update_many(
+            {"_id": {"$in": sent_ids}},
+            {"$set": {"status": "sent", "sent_at": now}, "$unset": {"lease_until": ""}},
+        )
+    if retry_ops:
+        db.outbox.bulk_write(retry_ops, ordered=False)
+    return len(sent_ids), len(retry_ops)
+
+
+def run_relay(batch_size: int = OUTBOX_BATCH_SIZE, interval: float = 1.0, once: bool = False):
+    """
+    Drain the outbox to Celery until stopped (or, with `once`, until nothing
+    is due), flushing closed digest windows as it goes. Sleeps `interval`
+    seconds only when there was nothing to send.
+    """
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    logger.info("📤 Outbox relay %s started", worker_id)
+    total_sent = 0
+    while True:
+        sent, failed = relay_batch(worker_id, batch_size)
+        digests = flush_digests()
+        total_sent += sent
+        if sent == 0 and failed == 0 and digests == 0:
+            if once:
+                return total_sent
+            time.sleep(interval)
@@ -0,0 +1,115 @@
+# backend/utils/pagination.py
+import base64
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we didn't issue."""
+
+
+def encode_cursor(doc: dict, field: str = "timestamp") -> str:
+    """
+    Opaque token pointing just past `doc` in a (field desc, _id desc) ordering.
+    """
+    value = doc.get(field) if field != "_id" else None
+    payload = {
+        "v": value.isoformat() if isinstance(value, datetime) else value,
+        "d": isinstance(value, datetime),
+        "id": str(doc["_id"]),
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str):
+    """Returns (value, ObjectId) from a token made by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        value = datetime.fromisoformat(payload["v"]) if payload.get("d") else payload["v"]
+        return value, ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise InvalidCursor(str(e))
+
+
+def keyset_filter(token: str, field: str = "timestamp", direction: int = -1) -> dict:
+    """
+    Filter that resumes a (field, _id) ordering after the cursor position.
+    Combined with a matching compound index this is one index seek, so
+    page 1,000 costs the same as page 1.
+
+    Null/missing values sort before everything else, but a range operator
+    never matches them, so they are handled explicitly: ascending, the nulls
+    come first and are followed by every non-null value; descending, they
+    come last and follow every non-null value.
+    """
+    value, last_id = decode_cursor(token)
+    op = "$lt" if direction < 0 else "$gt"
+    if field == "_id":
+        return {"_id": {op: last_id}}
+    same_value = {field: value, "_id": {op: last_id}}
+    if value is None:
+        if direction < 0:
+            return same_value
+        return {"$or": [{field: {"$ne": None}}, same_value]}
+    after = [{field: {op: value}}, same_value]
+    if direction < 0:
+        after.append({field: None})
+    return {"$or": after}
+
+
+def parse_date_range(start: str, end: str):
+    """
+    Turn ?start=YYYY-MM-DD&end=YYYY-MM-DD into a timestamp filter (end is inclusive).
+    Raises ValueError on a malformed date.
+    """
+    window = {}
+    if start:
+        window["$gte"] = datetime.strptime(start, "%Y-%m-%d")
+    if end:
+        window["$lt"] = datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1)
+    return window
+
+
+def keyset_page(cursor, limit: int, field: str = "timestamp"):
+    """
+    Split a cursor fetched with .limit(limit + 1) into (docs, next_cursor).
+    """
+    docs = list(cursor)
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = encode_cursor(docs[-1], field) if has_more and docs else None
+    return docs, next_cursor
+
+
+class CountCache:
+    """
+    Tiny per-process TTL cache for count_documents results, so clients that
+    ask for an exact total don't force an index scan on every page.
+    """
+
+    def __init__(self, ttl_seconds: float = 30, max_entries: int = 10_000):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_or_count(self, collection, query: dict) -> int:
+        key = (collection.name, json.dumps(query, sort_keys=True, default=str))
+        now = time.monotonic()
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit and hit[1] > now:
+                return hit[0]
+
+        total = collection.count_documents(query)
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (total, now + self.ttl)
+        return total
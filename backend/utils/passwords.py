@@ -0,0 +1,197 @@
+# backend/utils/passwords.py
+import hmac
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+# bcrypt cost for new hashes. Hashes made with another cost (and legacy
+# plaintext passwords) are upgraded on the next successful login.
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", 12))
+# bcrypt cost for bulk onboarding: cheap enough to hash a whole upload inside
+# the request (cost 4 is ~1000x cheaper than 12). These hashes are wrapped at
+# full cost right after the upload (see wrap_hashes), so they are never left weak.
+PASSWORD_MIGRATION_ROUNDS = int(os.getenv("PASSWORD_MIGRATION_ROUNDS", 4))
+# bcrypt releases the GIL, so a thread pool of about one worker per core
+# hashes in parallel without tying up the request threads' CPU.
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", os.cpu_count() or 2))
+# Hashing jobs allowed to wait for a worker; beyond that logins are shed (503)
+PASSWORD_POOL_QUEUE = int(os.getenv("PASSWORD_POOL_QUEUE", 64))
+PASSWORD_VERIFY_TIMEOUT = float(os.getenv("PASSWORD_VERIFY_TIMEOUT", 10))
+
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+# A weak hash brought up to full cost without the password: WRAPPED_PREFIX,
+# the weak hash's salt, then a full-cost bcrypt of the weak hash itself.
+# Verifying recomputes the weak hash from the password and checks it against
+# the outer one; the next login replaces it with a plain full-cost hash.
+WRAPPED_PREFIX = "$wrap$"
+BCRYPT_SALT_LENGTH = 29  # "$2b$04$" + 22 salt characters
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the hashing pool is saturated; answer 503 and let the client retry."""
+
+
+_lock = threading.Lock()
+_pool = {"pid": None, "executor": None, "slots": None, "bulk_slots": None, "dummy": None}
+
+
+def _state():
+    """The pool for this process (rebuilt after a fork: threads don't survive it)."""
+    with _lock:
+        if _pool["pid"] != os.getpid():
+            _pool.update(
+                pid=os.getpid(),
+                executor=ThreadPoolExecutor(max_workers=PASSWORD_POOL_WORKERS, thread_name_prefix="password"),
+                slots=threading.BoundedSemaphore(PASSWORD_POOL_WORKERS + PASSWORD_POOL_QUEUE),
+                # bulk hashing never holds more than half the workers, so logins keep flowing
+                bulk_slots=threading.BoundedSemaphore(max(1, PASSWORD_POOL_WORKERS // 2)),
+                dummy=None,
+            )
+        return _pool
+
+
+def _submit(slots, fn, *args, block=False):
+    if not slots.acquire(blocking=block):
+        raise PasswordPoolBusy()
+    try:
+        future = _state()["executor"].submit(fn, *args)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def _run(fn, *args):
+    future = _submit(_state()["slots"], fn, *args)
+    try:
+        return future.result(timeout=PASSWORD_VERIFY_TIMEOUT)
+    except FutureTimeout:
+        raise PasswordPoolBusy()
+
+
+def _hash(plain: str, rounds: int) -> str:
+    return bcrypt.hashpw(plain.encode("utf-8"), bcrypt.gensalt(rounds)).decode("ascii")
+
+
+def _check(plain: str, hashed: str) -> bool:
+    return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("ascii"))
+
+
+def _wrap(hashed: str, rounds: int) -> str:
+    return WRAPPED_PREFIX + hashed[:BCRYPT_SALT_LENGTH] + _hash(hashed, rounds)
+
+
+def _check_wrapped(plain: str, wrapped: str) -> bool:
+    salt = wrapped[len(WRAPPED_PREFIX):len(WRAPPED_PREFIX) + BCRYPT_SALT_LENGTH]
+    inner = bcrypt.hashpw(plain.encode("utf-8"), salt.encode("ascii")).decode("ascii")
+    return _check(inner, wrapped[len(WRAPPED_PREFIX) + BCRYPT_SALT_LENGTH:])
+
+
+def is_bcrypt_hash(value) -> bool:
+    return isinstance(value, str) and len(value) == 60 and value.startswith(BCRYPT_PREFIXES)
+
+
+def is_wrapped_hash(value) -> bool:
+    return (isinstance(value, str) and value.startswith(WRAPPED_PREFIX)
+            and is_bcrypt_hash(value[len(WRAPPED_PREFIX) + BCRYPT_SALT_LENGTH:]))
+
+
+def is_password_hash(value) -> bool:
+    """A stored hash (plain or wrapped bcrypt), as opposed to a plaintext password."""
+    return is_bcrypt_hash(value) or is_wrapped_hash(value)
+
+
+def hash_rounds(hashed: str) -> int:
+    return int(hashed[4:6])
+
+
+def weak_hash_pattern():
+    """Regex for bcrypt hashes below PASSWORD_HASH_ROUNDS, or None if there can't be any."""
+    costs = [f"{rounds:02d}" for rounds in range(4, PASSWORD_HASH_ROUNDS)]
+    if not costs:
+        return None
+    return r"^\$2[aby]\$(" + "|".join(costs) + r")\$"
+
+
+def hash_password(plain: str) -> str:
+    """bcrypt-hash a password on the pool. Raises PasswordPoolBusy."""
+    return _run(_hash, plain, PASSWORD_HASH_ROUNDS)
+
+
+def hash_passwords(plains, rounds: int = PASSWORD_MIGRATION_ROUNDS) -> list:
+    """
+    Hash many passwords (bulk onboarding), in order, at the migration cost
+    and using at most half the pool. Values that are already bcrypt hashes
+    are kept as they are.
+    """
+    bulk_slots = _state()["bulk_slots"]
+    futures = [
+        None if is_password_hash(p) else _submit(bulk_slots, _hash, p, rounds, block=True)
+        for p in plains
+    ]
+    return [p if f is None else f.result() for p, f in zip(plains, futures)]
+
+
+def wrap_hashes(hashes) -> list:
+    """
+    Wrap weak bcrypt hashes at PASSWORD_HASH_ROUNDS, in order, on the pool
+    (waiting for a slot rather than shedding: this is background work).
+    """
+    state = _state()
+    futures = [_submit(state["slots"], _wrap, h, PASSWORD_HASH_ROUNDS, block=True) for h in hashes]
+    return [f.result() for f in futures]
+
+
+def verify_password(plain, stored) -> tuple:
+    """
+    Check `plain` against a stored bcrypt hash (plain or wrapped) or a legacy
+    plaintext password. Returns (ok, needs_rehash). Raises PasswordPoolBusy.
+    """
+    if not isinstance(plain, str) or not stored:
+        return False, False
+    if is_wrapped_hash(stored):
+        ok = _run(_check_wrapped, plain, stored)
+        return ok, ok
+    if is_bcrypt_hash(stored):
+        ok = _run(_check, plain, stored)
+        return ok, ok and hash_rounds(stored) != PASSWORD_HASH_ROUNDS
+    ok = hmac.compare_digest(str(stored).encode("utf-8"), plain.encode("utf-8"))
+    return ok, ok
+
+
+def burn_verification(plain):
+    """
+    Spend one verification's worth of time on an unknown account, so response
+    times don't reveal which emails exist.
+    """
+    state = _state()
+    if state["dummy"] is None:
+        state["dummy"] = _hash("not-a-password", PASSWORD_HASH_ROUNDS)
+    if isinstance(plain, str):
+        _run(_check, plain, state["dummy"])
+
+
+def rehash_in_background(collection, doc_id, plain: str, stored):
+    """
+    Upgrade a stored password after a successful login without delaying the
+    response. Conditional on the old value, so a concurrent change wins.
+    Skipped when the pool is busy; the next login tries again.
+    """
+    def _rehash():
+        try:
+            collection.update_one(
+                {"_id": doc_id, "password": stored},
+                {"$set": {"password": _hash(plain, PASSWORD_HASH_ROUNDS)}},
+            )
+        except Exception:
+            logger.exception("❌ Password rehash failed for %s", doc_id)
+
+    try:
+        _submit(_state()["slots"], _rehash)
+    except PasswordPoolBusy:
+        pass
@@ -0,0 +1,100 @@
+# backend/utils/rate_limit.py
+import logging
+import math
+import os
+from redis.exceptions import RedisError
+from backend.extensions import redis_client
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# If Redis is unreachable, let requests through rather than taking login
+# and transfers down with it.
+RATE_LIMIT_FAIL_OPEN = os.getenv("RATE_LIMIT_FAIL_OPEN", "true").lower() == "true"
+# Number of reverse proxies in front of the app whose X-Forwarded-For we trust
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", 0))
+
+RATE_LIMIT_LOGIN_IP = os.getenv("RATE_LIMIT_LOGIN_IP", "30/minute")
+RATE_LIMIT_LOGIN_USER = os.getenv("RATE_LIMIT_LOGIN_USER", "5/minute")
+RATE_LIMIT_TRANSFER_IP = os.getenv("RATE_LIMIT_TRANSFER_IP", "60/minute")
+RATE_LIMIT_TRANSFER_USER = os.getenv("RATE_LIMIT_TRANSFER_USER", "20/minute")
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Token buckets, all checked and charged atomically in one round trip.
+# KEYS: bucket keys. ARGV: cost, then (capacity, tokens per ms) per key.
+# Buckets are only charged if every one of them has room; otherwise the
+# reply carries how many ms until they all would. Redis' own clock is used
+# so app servers with skewed clocks share buckets correctly.
+TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local cost = tonumber(ARGV[1])
+local wait = 0
+local levels = {}
+for i, key in ipairs(KEYS) do
+  local capacity = tonumber(ARGV[i * 2])
+  local rate = tonumber(ARGV[i * 2 + 1])
+  local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = tonumber(bucket[1]) or capacity
+  local ts = tonumber(bucket[2]) or now
+  tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+  if tokens < cost then
+    wait = math.max(wait, math.ceil((cost - tokens) / rate))
+  end
+  levels[i] = tokens
+end
+if wait > 0 then
+  return {0, wait}
+end
+for i, key in ipairs(KEYS) do
+  local capacity = tonumber(ARGV[i * 2])
+  local rate = tonumber(ARGV[i * 2 + 1])
+  redis.call('HSET', key, 'tokens', tostring(levels[i] - cost), 'ts', now)
+  redis.call('PEXPIRE', key, math.ceil(capacity / rate) + 1000)
+end
+return {1, 0}
+"""
+
+_token_bucket = redis_client.register_script(TOKEN_BUCKET_LUA)
+
+
+def parse_limit(spec: str):
+    """
+    "10/minute" -> (capacity 10, refill 10 tokens per minute, in tokens/ms).
+    A burst of `capacity` requests is allowed, then the steady rate.
+    """
+    count, _, period = spec.partition("/")
+    seconds = PERIODS[period.strip().lower()]
+    capacity = float(count)
+    return capacity, capacity / (seconds * 1000)
+
+
+def take(buckets, cost: float = 1):
+    """
+    Charge `cost` tokens to every (key, limit_spec) bucket in one EVALSHA.
+    Returns (allowed, retry_after_seconds).
+    """
+    buckets = [(key, spec) for key, spec in buckets if key and spec]
+    if not RATE_LIMIT_ENABLED or not buckets:
+        return True, 0
+
+    args = [cost]
+    for _, spec in buckets:
+        args.extend(parse_limit(spec))
+    try:
+        allowed, wait_ms = _token_bucket(keys=[key for key, _ in buckets], args=args)
+    except RedisError as e:
+        logger.warning("⚠️ Rate limiter unavailable (%s); %s", e, "allowing" if RATE_LIMIT_FAIL_OPEN else "rejecting")
+        return RATE_LIMIT_FAIL_OPEN, 1
+    return bool(allowed), math.ceil(int(wait_ms) / 1000)
+
+
+def client_ip(request) -> str:
+    """The caller's address; with N trusted proxies, the N-th X-Forwarded-For entry from the right."""
+    n = RATE_LIMIT_TRUSTED_PROXIES
+    if n and "X-Forwarded-For" in request.headers:
+        forwarded = request.access_route
+        if len(forwarded) >= n:
+            return forwarded[-n]
+    return request.remote_addr or "unknown"
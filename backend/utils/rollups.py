@@ -0,0 +1,173 @@
+# backend/utils/rollups.py
+import hashlib
+from datetime import datetime
+from pymongo import UpdateOne
+from backend.extensions import db
+
+# Same coercion the chart always used: numbers or numeric strings, else 0
+SAFE_AMOUNT = {"$convert": {"input": "$amount", "to": "double", "onError": 0.0, "onNull": 0.0}}
+# Missing or empty narrations are grouped under "Other"
+NARRATION_KEY = {"$cond": [{"$gt": [{"$ifNull": ["$narration", ""]}, ""]}, "$narration", "Other"]}
+
+
+def color_from_text(text: str) -> str:
+    """
+    Generate a consistent HEX color from a string (narration).
+    """
+    hex_digest = hashlib.md5(text.encode("utf-8")).hexdigest()
+    return f"#{hex_digest[:6]}"
+
+
+def month_key(ts: datetime) -> str:
+    return ts.strftime("%Y-%m")
+
+
+def _rollup_key(debit_entry: dict) -> tuple:
+    return debit_entry["user_id"], month_key(debit_entry["timestamp"]), debit_entry.get("narration") or "Other"
+
+
+def _in_rollups(tx: dict) -> bool:
+    """Whether a transaction is counted in a rollup (same rule as the rebuild)."""
+    return tx.get("type") == "debit" and bool(tx.get("user_id")) and isinstance(tx.get("timestamp"), datetime)
+
+
+def _rollup_amount(debit_entry: dict) -> float:
+    try:
+        return float(debit_entry.get("amount", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _rollup_inc(key, total: float, count: int) -> UpdateOne:
+    user_id, month, narration = key
+    return UpdateOne(
+        {"user_id": user_id, "month": month, "narration": narration},
+        {
+            "$inc": {"total": total, "count": count},
+            "$setOnInsert": {"color": color_from_text(narration)},
+        },
+        upsert=True,
+    )
+
+
+def spending_rollup_op(debit_entry: dict) -> UpdateOne:
+    """
+    $inc for the (user_id, month, narration) rollup a debit belongs to.
+    The chart color is computed once, when the rollup is created.
+    """
+    return _rollup_inc(_rollup_key(debit_entry), _rollup_amount(debit_entry), 1)
+
+
+def spending_rollup_edit_ops(pairs) -> list:
+    """
+    $inc ops moving the rollups from each (before, after) version of an
+    edited transaction: the old debit is taken out of its rollup, the new
+    one added to its own. Relative, so debits posted meanwhile are kept;
+    edits that don't touch a debit's key or amount cancel out.
+    """
+    net = {}
+    for before, after in pairs:
+        for tx, sign in ((before, -1), (after, 1)):
+            if not _in_rollups(tx):
+                continue
+            key = _rollup_key(tx)
+            total, count = net.get(key, (0.0, 0))
+            net[key] = (total + sign * _rollup_amount(tx), count + sign)
+    return [_rollup_inc(key, total, count) for key, (total, count) in net.items() if total or count]
+
+
+def _raw_spending_pipeline(user_id=None, month=None):
+    """Group raw debits the same way the rollups are keyed."""
+    match = {"type": "debit"}
+    if user_id:
+        match["user_id"] = user_id
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "month": {"$cond": [
+                    {"$eq": [{"$type": "$timestamp"}, "date"]},
+                    {"$dateToString": {"format": "%Y-%m", "date": "$timestamp"}},
+                    None,
+                ]},
+                "narration": NARRATION_KEY,
+            },
+            "total": {"$sum": SAFE_AMOUNT},
+            "count": {"$sum": 1},
+        }},
+    ]
+    if month:
+        pipeline.append({"$match": {"_id.month": month}})
+    return pipeline
+
+
+def _scope(user_id=None, month=None) -> dict:
+    scope = {}
+    if user_id:
+        scope["user_id"] = user_id
+    if month:
+        scope["month"] = month
+    return scope
+
+
+def rebuild_spending_rollups(user_id=None, month=None) -> int:
+    """
+    Recompute rollups from the raw transactions (all, or one user/month).
+    For `flask rollups rebuild` only: debits landing mid-rebuild can be
+    overwritten, so live code paths use $inc ops instead. Returns the number
+    of rollup documents written.
+    """
+    db.spending_rollups.delete_many(_scope(user_id, month))
+
+    ops = []
+    written = 0
+    for row in db.transactions.aggregate(_raw_spending_pipeline(user_id, month), allowDiskUse=True):
+        key = row["_id"]
+        if key["month"] is None:  # no usable timestamp
+            continue
+        ops.append(UpdateOne(
+            key,
+            {"$set": {
+                "total": row["total"],
+                "count": row["count"],
+                "color": color_from_text(key["narration"]),
+            }},
+            upsert=True,
+        ))
+        if len(ops) >= 1000:
+            written += db.spending_rollups.bulk_write(ops, ordered=False).upserted_count
+            ops = []
+    if ops:
+        written += db.spending_rollups.bulk_write(ops, ordered=False).upserted_count
+    return written
+
+
+def check_spending_rollups(user_id=None, month=None, tolerance: float = 0.005):
+    """
+    Compare rollups with the raw debits. Returns a list of mismatches as
+    dicts with the key and both (total, count) pairs; empty means consistent.
+    """
+    raw = {}
+    for row in db.transactions.aggregate(_raw_spending_pipeline(user_id, month), allowDiskUse=True):
+        key = row["_id"]
+        if key["month"] is None:
+            continue
+        raw[(key["user_id"], key["month"], key["narration"])] = (row["total"], row["count"])
+
+    stored = {
+        (r["user_id"], r["month"], r["narration"]): (r.get("total", 0.0), r.get("count", 0))
+        for r in db.spending_rollups.find(_scope(user_id, month))
+    }
+
+    mismatches = []
+    for key in raw.keys() | stored.keys():
+        expected = raw.get(key, (0.0, 0))
+        actual = stored.get(key, (0.0, 0))
+        if abs(expected[0] - actual[0]) > tolerance or expected[1] != actual[1]:
+            mismatches.append({
+                "user_id": key[0], "month": key[1], "narration": key[2],
+                "expected": {"total": expected[0], "count": expected[1]},
+                "actual": {"total": actual[0], "count": actual[1]},
+            })
+    return mismatches
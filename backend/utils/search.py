@@ -0,0 +1,64 @@
+# backend/utils/search.py
+import re
+from pymongo import UpdateOne
+from backend.extensions import db
+
+SEARCH_FIELDS = ("firstName", "middleName", "lastName", "email", "accountNumber")
+SEARCH_MIN_LENGTH = 2
+
+
+def normalise(text) -> str:
+    """Lowercase and collapse whitespace so 'John  SMITH' matches 'john smith'."""
+    return " ".join(str(text or "").lower().split())
+
+
+def search_keys(user: dict) -> list:
+    """
+    Normalised prefixes a user can be found by: each name part, the full
+    name (with and without middle name), email and account number. Stored on
+    the user as `search_keys` with a multikey index, so an anchored prefix
+    regex is a tight index range scan.
+    """
+    first = normalise(user.get("firstName"))
+    middle = normalise(user.get("middleName"))
+    last = normalise(user.get("lastName"))
+    keys = {
+        first, middle, last,
+        normalise(f"{first} {last}"),
+        normalise(f"{first} {middle} {last}"),
+        normalise(f"{last} {first}"),
+        normalise(user.get("name")),
+        normalise(user.get("email")),
+        normalise(user.get("accountNumber")),
+    }
+    keys.discard("")
+    return sorted(keys)
+
+
+def search_query(q: str) -> dict:
+    """Anchored, case-normalised prefix match on search_keys."""
+    return {"search_keys": {"$regex": f"^{re.escape(normalise(q))}"}}
+
+
+def refresh_search_keys(user: dict):
+    """Re-derive search_keys after an edit, writing only if they changed."""
+    keys = search_keys(user)
+    if keys != user.get("search_keys"):
+        db.users.update_one({"_id": user["_id"]}, {"$set": {"search_keys": keys}})
+
+
+def backfill_search_keys(batch_size: int = 1000) -> int:
+    """Populate search_keys for every user. Returns the number updated."""
+    projection = {field: 1 for field in SEARCH_FIELDS + ("name", "search_keys")}
+    ops = []
+    updated = 0
+    for user in db.users.find({}, projection):
+        keys = search_keys(user)
+        if keys != user.get("search_keys"):
+            ops.append(UpdateOne({"_id": user["_id"]}, {"$set": {"search_keys": keys}}))
+        if len(ops) >= batch_size:
+            updated += db.users.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += db.users.bulk_write(ops, ordered=False).modified_count
+    return updated
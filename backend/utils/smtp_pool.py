@@ -0,0 +1,210 @@
+# backend/utils/smtp_pool.py
+import atexit
+import logging
+import os
+import smtplib
+import threading
+import time
+from flask import current_app
+from flask_mail import BadHeaderError, email_dispatched, sanitize_address, sanitize_addresses
+
+logger = logging.getLogger(__name__)
+
+# Idle authenticated connections kept per worker process
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 2))
+# QUIT and reconnect after this many messages (providers cap messages per session)
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", 100))
+# A connection idle longer than this is probed with NOOP before reuse
+SMTP_NOOP_AFTER = float(os.getenv("SMTP_NOOP_AFTER", 30))
+# ...and one idle longer than this is assumed dropped by the server and discarded
+SMTP_MAX_IDLE = float(os.getenv("SMTP_MAX_IDLE", 240))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", 30))
+
+# The server dropped the session: the message was not accepted, safe to resend once
+DISCONNECTS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class PooledConnection:
+    def __init__(self, host):
+        self.host = host
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class SmtpPool:
+    """
+    Authenticated SMTP connections reused across messages in one worker
+    process. A connection is handed to one send at a time, probed with
+    NOOP after SMTP_NOOP_AFTER idle seconds, and replaced after
+    SMTP_MAX_MESSAGES_PER_CONNECTION messages, on a disconnect, or after
+    a fork. Settings come from Flask-Mail's state (app.extensions["mail"]).
+    """
+
+    def __init__(self, state, size=SMTP_POOL_SIZE, max_messages=SMTP_MAX_MESSAGES_PER_CONNECTION,
+                 noop_after=SMTP_NOOP_AFTER, max_idle=SMTP_MAX_IDLE, timeout=SMTP_TIMEOUT):
+        self.state = state
+        self.size = size
+        self.max_messages = state.max_emails or max_messages
+        self.noop_after = noop_after
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle = []  # LIFO: the most recently used connection is the least likely to be stale
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self.stats = {"sent": 0, "connects": 0, "reuses": 0, "stale": 0, "recycled": 0}
+
+    # ----------------- connections -----------------
+    def _connect(self) -> PooledConnection:
+        state = self.state
+        if state.use_ssl:
+            host = smtplib.SMTP_SSL(state.server, state.port, timeout=self.timeout)
+        else:
+            host = smtplib.SMTP(state.server, state.port, timeout=self.timeout)
+        try:
+            host.set_debuglevel(int(state.debug))
+            if state.use_tls:
+                host.starttls()
+            if state.username and state.password:
+                host.login(state.username, state.password)
+        except BaseException:
+            host.close()
+            raise
+        self.stats["connects"] += 1
+        return PooledConnection(host)
+
+    @staticmethod
+    def _quit(conn: PooledConnection):
+        try:
+            conn.host.quit()
+        except (smtplib.SMTPException, OSError):
+            conn.host.close()
+
+    def _usable(self, conn: PooledConnection) -> bool:
+        idle = time.monotonic() - conn.last_used
+        if idle > self.max_idle:
+            conn.host.close()
+            return False
+        if idle > self.noop_after:
+            try:
+                if conn.host.noop()[0] != 250:
+                    raise smtplib.SMTPServerDisconnected("NOOP refused")
+            except (smtplib.SMTPException, OSError):
+                conn.host.close()
+                return False
+        return True
+
+    def _acquire(self) -> PooledConnection:
+        with self._lock:
+            if self._pid != os.getpid():
+                # forked child: the sockets belong to the parent's sessions, close our copies only
+                for conn in self._idle:
+                    conn.host.close()
+                self._idle, self._pid = [], os.getpid()
+            while self._idle:
+                conn = self._idle.pop()
+                if self._usable(conn):
+                    self.stats["reuses"] += 1
+                    return conn
+                self.stats["stale"] += 1
+        return self._connect()
+
+    def _release(self, conn: PooledConnection):
+        conn.last_used = time.monotonic()
+        if conn.host.sock is None:
+            return  # smtplib closed it (e.g. a 421 reply)
+        if conn.sent >= self.max_messages:
+            self.stats["recycled"] += 1
+            self._quit(conn)
+            return
+        with self._lock:
+            if self._pid == os.getpid() and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        self._quit(conn)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+            forked = self._pid != os.getpid()
+        for conn in idle:
+            if forked:
+                conn.host.close()
+            else:
+                self._quit(conn)
+
+    # ----------------- API -----------------
+    def send(self, message, envelope_from=None):
+        """Send a flask_mail.Message over a pooled connection (same checks and signal as mail.send)."""
+        assert message.send_to, "No recipients have been added"
+        assert message.sender, (
+            "The message does not specify a sender and a default sender has not been configured"
+        )
+        if message.has_bad_headers():
+            raise BadHeaderError
+        if message.date is None:
+            message.date = time.time()
+
+        if not self.state.suppress:
+            args = (
+                sanitize_address(envelope_from or message.sender),
+                list(sanitize_addresses(message.send_to)),
+                message.as_bytes(),
+                message.mail_options,
+                message.rcpt_options,
+            )
+            for attempt in (1, 2):
+                conn = self._acquire()
+                try:
+                    conn.host.sendmail(*args)
+                except DISCONNECTS as e:
+                    # server closed a reused session under us: retry once on a fresh one
+                    conn.host.close()
+                    self.stats["stale"] += 1
+                    if attempt == 2:
+                        raise
+                    logger.warning("⚠️ SMTP connection dropped (%s), reconnecting", e)
+                    continue
+                except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                    # rejected message (sendmail already sent RSET); the session is still good
+                    self._release(conn)
+                    raise
+                except BaseException:
+                    conn.host.close()
+                    raise
+                conn.sent += 1
+                self._release(conn)
+                break
+
+        self.stats["sent"] += 1
+        email_dispatched.send(current_app._get_current_object(), message=message)
+
+
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+
+def _settings(state) -> tuple:
+    return (state.server, state.port, state.use_tls, state.use_ssl,
+            state.username, state.password, state.max_emails, state.suppress)
+
+
+def get_smtp_pool() -> SmtpPool:
+    """The process-wide pool for the current app's mail settings."""
+    global _pool, _pool_key
+    state = current_app.extensions["mail"]
+    key = _settings(state)
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            # keyed on settings, not the app object: a per-task app must not empty the pool
+            if _pool is not None:
+                _pool.close()
+            else:
+                atexit.register(lambda: _pool and _pool.close())
+            _pool, _pool_key = SmtpPool(state), key
+        return _pool
+
+
+def send_mail(message):
+    """Drop-in for mail.send(message) that reuses the worker's SMTP connections."""
+    get_smtp_pool().send(message)
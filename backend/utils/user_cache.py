@@ -0,0 +1,104 @@
+# backend/utils/user_cache.py
+import os
+import threading
+import time
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import g, has_request_context
+from backend.extensions import db
+
+# How long a user's blocked flag is trusted without re-reading it.
+# The cache is per process: invalidate_user() clears it locally, other
+# workers pick the change up within this window.
+USER_STATUS_TTL_SECONDS = float(os.getenv("USER_STATUS_TTL_SECONDS", 5))
+USER_STATUS_MAX_ENTRIES = int(os.getenv("USER_STATUS_MAX_ENTRIES", 100_000))
+
+_lock = threading.Lock()
+_status = {}  # user_id -> (blocked, expires_at)
+_stats = {
+    "request_hits": 0,
+    "request_misses": 0,
+    "status_hits": 0,
+    "status_misses": 0,
+    "invalidations": 0,
+}
+
+
+def _count(name: str):
+    with _lock:
+        _stats[name] += 1
+
+
+def get_user(user_id: str):
+    """
+    Load a user by _id at most once per request (cached on flask.g).
+    Returns None if the id is invalid or the user doesn't exist.
+    """
+    cache = g.setdefault("_users", {}) if has_request_context() else {}
+    if user_id in cache:
+        _count("request_hits")
+        return cache[user_id]
+
+    _count("request_misses")
+    try:
+        user = db.users.find_one({"_id": ObjectId(user_id)})
+    except (InvalidId, TypeError):
+        user = None
+    cache[user_id] = user
+    if user is not None:
+        remember_status(user_id, user.get("blocked", False))
+    return user
+
+
+def remember_status(user_id: str, blocked: bool):
+    with _lock:
+        if len(_status) >= USER_STATUS_MAX_ENTRIES:
+            _status.clear()
+        _status[user_id] = (bool(blocked), time.monotonic() + USER_STATUS_TTL_SECONDS)
+
+
+def is_blocked(user_id: str):
+    """
+    Blocked flag from the shared TTL cache, falling back to get_user().
+    Returns None if the user doesn't exist.
+    """
+    with _lock:
+        hit = _status.get(user_id)
+        if hit and hit[1] > time.monotonic():
+            _stats["status_hits"] += 1
+            return hit[0]
+        _stats["status_misses"] += 1
+
+    user = get_user(user_id)
+    if user is None:
+        return None
+    return bool(user.get("blocked", False))
+
+
+def invalidate_user(user_id):
+    """Forget a user after an admin change (status, profile, delete)."""
+    user_id = str(user_id)
+    with _lock:
+        _status.pop(user_id, None)
+        _stats["invalidations"] += 1
+    if has_request_context():
+        g.setdefault("_users", {}).pop(user_id, None)
+
+
+def invalidate_all_users():
+    """Forget every cached user, for bulk changes selected by a filter."""
+    with _lock:
+        _status.clear()
+        _stats["invalidations"] += 1
+    if has_request_context():
+        g.pop("_users", None)
+
+
+def cache_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+        stats["status_entries"] = len(_status)
+    for kind in ("request", "status"):
+        lookups = stats[f"{kind}_hits"] + stats[f"{kind}_misses"]
+        stats[f"{kind}_hit_ratio"] = round(stats[f"{kind}_hits"] / lookups, 4) if lookups else None
+    return stats